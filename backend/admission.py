@@ -0,0 +1,152 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+
+
+class AdmissionRejected(Exception):
+    """status 429 (Warteschlange voll) oder 503 (zu lange gewartet)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+# ======================================================
+# ADMISSION CONTROL (RENDER-SLOTS)
+# ======================================================
+class AdmissionController:
+    """
+    Begrenzt gleichzeitige Renders pro Prozess (je Render ein komplettes
+    Workbook im Speicher) statt sie unbegrenzt anzunehmen.
+
+    - bis `max_in_flight` Requests rendern sofort
+    - bis `max_queue` weitere warten (FIFO) höchstens `queue_timeout` s,
+      danach 503
+    - ist auch die Warteschlange voll: sofort 429
+    Beide Antworten tragen Retry-After. max_in_flight <= 0 schaltet ab.
+
+    Zustand gehört dem Event-Loop (kein Lock nötig). Jobs und Batch-ZIPs
+    rendern aus Worker-Threads und nehmen ihre Slots über
+    acquire_from_thread / release_from_thread; sie warten ohne Limit in
+    derselben FIFO (eigene Warteschlange bzw. Antwort läuft schon).
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float, retry_after: int = 2):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.peak_queue = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def check(self):
+        """Sofort 429, wenn auch die Warteschlange voll ist (ohne Slot zu nehmen)."""
+        if self.enabled and len(self._waiters) >= self.max_queue:
+            self.rejected_full += 1
+            raise AdmissionRejected(429, "Too many concurrent requests, retry later", self.retry_after)
+
+    async def acquire(self, bounded: bool = True):
+        if not self.enabled:
+            return
+
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if bounded:
+            self.check()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        self.peak_queue = max(self.peak_queue, len(self._waiters))
+
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout if bounded else None)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.rejected_timeout += 1
+            raise AdmissionRejected(503, "Server busy, retry later", self.retry_after)
+        except BaseException:
+            # Client weg (CancelledError) -> Platz nicht verlieren
+            self._abandon(waiter)
+            raise
+
+        self.admitted += 1
+
+    def release(self):
+        if not self.enabled:
+            return
+
+        # Slot direkt an den nächsten Wartenden weitergeben
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _abandon(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        if waiter.done() and not waiter.cancelled():
+            # Slot wurde noch übergeben, bevor der Timeout griff
+            self.release()
+
+    def acquire_from_thread(self, loop: asyncio.AbstractEventLoop):
+        """Blockierend aus einem Worker-Thread; wartet ohne Limit."""
+        if self.enabled:
+            asyncio.run_coroutine_threadsafe(self.acquire(bounded=False), loop).result()
+
+    def release_from_thread(self, loop: asyncio.AbstractEventLoop):
+        if not self.enabled:
+            return
+        try:
+            loop.call_soon_threadsafe(self.release)
+        except RuntimeError:
+            # Loop schon beendet (Shutdown)
+            pass
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "peak_queue": self.peak_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
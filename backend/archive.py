@@ -0,0 +1,44 @@
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+
+class _ChunkBuffer:
+    """
+    Nicht-seekbares Schreibziel für ZipFile.
+    ZipFile schreibt dann Data-Descriptors und wir können jeden
+    fertigen Eintrag sofort weiterreichen.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """
+    Baut ein ZIP-Archiv inkrementell: nach jedem Eintrag werden die
+    bereits geschriebenen Bytes geliefert (für StreamingResponse).
+
+    xlsx/pdf sind bereits komprimiert -> ZIP_STORED spart CPU.
+    """
+    buffer = _ChunkBuffer()
+
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for name, content in entries:
+            zf.writestr(name, content)
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+
+    yield buffer.drain()
@@ -0,0 +1,105 @@
+"""
+Benchmark: normalize_vehicle_input für 10 / 1k / 100k Codes.
+
+    cd backend
+    python bench/bench_normalize.py
+
+Vergleicht den aktuellen Single-Pass-Normalizer (mit Katalog-Index)
+mit der alten Zwei-Schleifen-Variante (Listen-Lookup, O(n²)).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vehicle_parser import (  # noqa: E402
+    build_option_index,
+    normalize_vehicle_input,
+    parse_priced_lines,
+)
+
+CATEGORIES = ["base", "standard", "security", "optional"]
+
+# Alte Variante ist quadratisch -> nur bis hier messen
+LEGACY_MAX_CODES = 10_000
+
+
+def make_catalog(size: int) -> dict:
+    return {
+        f"C{i:06d}": {"label": f"Option {i}", "category": CATEGORIES[i % len(CATEGORIES)]}
+        for i in range(size)
+    }
+
+
+def legacy_normalize(*, all_codes, priced_lines, options_meta):
+    priced_prices = parse_priced_lines(priced_lines)
+    result = {"base": [], "standard": [], "optional": [], "security": [], "total_price": 0.0}
+
+    base_codes = []
+    for code in all_codes:
+        meta = options_meta.get(code)
+        if meta and meta.get("category") == "base":
+            base_codes.append(code)
+
+    for code in base_codes:
+        meta = options_meta.get(code, {})
+        text = meta.get("text") or meta.get("label") or meta.get("description") or code
+        result["base"].append({"code": code, "text": text, "price": 0.0})
+
+    for code in all_codes:
+        if code in base_codes:
+            continue
+        meta = options_meta.get(code)
+        if not meta:
+            continue
+        category = meta.get("category")
+        text = meta.get("text") or meta.get("label") or meta.get("description") or code
+        price = priced_prices.get(code, 0.0)
+        item = {"code": code, "text": text, "price": price}
+        if category in ("standard", "optional", "security"):
+            result[category].append(item)
+        result["total_price"] += price
+
+    return result
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    print(f"{'codes':>8} {'single-pass':>14} {'legacy':>14} {'speedup':>9}")
+
+    for size in (10, 1_000, 100_000):
+        catalog = make_catalog(size)
+        index = build_option_index(catalog)
+        codes = list(catalog)
+        repeat = 5 if size < 100_000 else 3
+
+        new = timed(
+            lambda: normalize_vehicle_input(
+                model="", color="", interior="",
+                all_codes=codes, priced_lines=[],
+                options_meta=catalog, option_index=index
+            ),
+            repeat
+        )
+
+        if size <= LEGACY_MAX_CODES:
+            old = timed(
+                lambda: legacy_normalize(all_codes=codes, priced_lines=[], options_meta=catalog),
+                repeat
+            )
+            print(f"{size:>8} {new * 1e3:>12.3f}ms {old * 1e3:>12.3f}ms {old / new:>8.1f}x")
+        else:
+            print(f"{size:>8} {new * 1e3:>12.3f}ms {'(skipped)':>14} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: parse_priced_lines für 1k / 100k Zeilen.
+
+    cd backend
+    python bench/bench_tokenizer.py
+
+Vergleicht den Tokenizer mit dem alten PRICE_LINE_REGEX-Pfad auf
+klassischen 'CODE Text PREIS'-Zeilen (die der Regex auch versteht),
+auf Zeilen mit Zahlen im Text ('Stufe 2', 'Felgen 19 Zoll') und auf
+gemischten Händler-Exporten, von denen der Regex einen Großteil verwirft.
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vehicle_parser import ParseStats, parse_priced_lines  # noqa: E402
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+LEGACY_REGEX = re.compile(
+    r"^(?P<code>[A-Z0-9]{3})\s+.+?\s+(?P<price>\d+(?:[.,]\d+)?)$"
+)
+
+
+def legacy_parse(lines):
+    prices = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        match = LEGACY_REGEX.match(line)
+        if not match:
+            continue
+        prices[match.group("code")] = float(match.group("price").replace(",", "."))
+    return prices
+
+
+def make_code(i: int) -> str:
+    return "".join(ALPHABET[(i // 36 ** k) % 36] for k in (2, 1, 0))
+
+
+def plain_lines(size: int):
+    return [f"{make_code(i)} Option {i} mit Text {100 + i % 900},50" for i in range(size)]
+
+
+def numbers_lines(size: int):
+    formats = [
+        "{code} Option {i} 150,50",
+        "{code} Sitzheizung Stufe 2 150,50",
+        "{code} Felgen 19 Zoll 1500",
+    ]
+    return [formats[i % len(formats)].format(code=make_code(i), i=i) for i in range(size)]
+
+
+def mixed_lines(size: int):
+    formats = [
+        "{code} Option {i} {price},50",
+        "{code} Option {i} {thousands}.{price},00 €",
+        "{code}\tOption {i}\t{price}.25",
+        "{code};Option {i};{thousands}.{price},99",
+        "{code},Option {i},{price}",
+        "{code} Option {i} EUR {thousands},{price}.00",
+    ]
+    return [
+        formats[i % len(formats)].format(
+            code=make_code(i), i=i, price=100 + i % 900, thousands=1 + i % 9
+        )
+        for i in range(size)
+    ]
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    print(f"{'input':>14} {'tokenizer':>12} {'regex':>12} {'speedup':>9} {'found (tok / regex)':>22}")
+
+    for name, make_lines in (("plain", plain_lines), ("numbers", numbers_lines), ("mixed", mixed_lines)):
+        for size in (1_000, 100_000):
+            lines = make_lines(size)
+            repeat = 20 if size < 100_000 else 5
+
+            new = timed(lambda: parse_priced_lines(lines), repeat)
+            old = timed(lambda: legacy_parse(lines), repeat)
+
+            stats = ParseStats()
+            found_new = len(parse_priced_lines(lines, stats))
+            found_old = len(legacy_parse(lines))
+
+            label = f"{name} {size}"
+            print(
+                f"{label:>14} {new * 1e3:>10.2f}ms {old * 1e3:>10.2f}ms {old / new:>8.2f}x "
+                f"{found_new:>10} / {found_old:<10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Benchmark-Suite für den Hot Path: Parser, Normalizer, Pricing, Renderer.
+
+    cd backend
+    python bench/run.py                              # alle Fälle, alle Größen
+    python bench/run.py --sizes tiny,small --only parse
+    python bench/run.py --output bench/results.json
+    python bench/run.py --baseline bench/results.json --threshold 0.2
+
+Ergebnisse landen als JSON (beste / mediane Laufzeit pro Fall und Größe).
+Mit --baseline wird verglichen; ist ein Fall mehr als `threshold`
+langsamer als in der Baseline, endet der Lauf mit Exit-Code 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_builder import build_excel_bytes  # noqa: E402
+from pdf_builder import build_pdf  # noqa: E402
+from pricing import PriceTable, resolve_multiple_options  # noqa: E402
+from vehicle_parser import (  # noqa: E402
+    build_option_index,
+    normalize_vehicle_input,
+    parse_priced_lines,
+)
+
+SIZES = {
+    "tiny": 10,
+    "small": 100,
+    "medium": 1_000,
+    "large": 10_000,
+    "huge": 100_000,
+}
+
+CATEGORIES = ["base", "standard", "security", "optional"]
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Zeitbudget pro Fall (Sekunden) und Wiederholungen
+TIME_BUDGET = 2.0
+MIN_RUNS = 3
+MAX_RUNS = 50
+
+
+# ======================================================
+# SYNTHETISCHE DATEN
+# ======================================================
+def make_code(i: int) -> str:
+    """
+    Eindeutige Options-Codes: 000..ZZZ, danach 4-stellig wie '66GR' im
+    Katalog - "huge" sind also wirklich 100k verschiedene Codes.
+    """
+    code = ""
+    while i or len(code) < 3:
+        i, digit = divmod(i, 36)
+        code = ALPHABET[digit] + code
+    return code
+
+
+def make_short_code(i: int) -> str:
+    """
+    Immer 3-stellig wie im klassischen Preislisten-Format; ab 36³ beginnen
+    die Codes von vorn (Wiederholungen wie bei doppelt eingefügten Zeilen).
+    Nur für den Tokenizer-Fall, damit er mit älteren Läufen vergleichbar bleibt.
+    """
+    return "".join(ALPHABET[(i // 36 ** k) % 36] for k in (2, 1, 0))
+
+
+def make_codes(size: int) -> List[str]:
+    return [make_code(i) for i in range(size)]
+
+
+def make_catalog(size: int, priced: bool = False) -> Dict:
+    catalog = {}
+    for i in range(size):
+        meta = {"label": f"Option {i}", "category": CATEGORIES[i % len(CATEGORIES)]}
+        if priced:
+            meta["prices"] = [
+                {"from": f"{year}-01-01", "price": 100.0 + i + year}
+                for year in (2023, 2024, 2025, 2026)
+            ]
+        catalog[make_code(i)] = meta
+    return catalog
+
+
+def make_priced_lines(size: int, code: Callable[[int], str] = make_code) -> List[str]:
+    return [f"{code(i)} Option {i} {100 + i % 900},50" for i in range(size)]
+
+
+def make_vehicle_data(size: int) -> Dict:
+    catalog = make_catalog(size)
+    return normalize_vehicle_input(
+        model="", color="", interior="",
+        all_codes=make_codes(size),
+        priced_lines=make_priced_lines(size),
+        options_meta=catalog,
+        option_index=build_option_index(catalog)
+    )
+
+
+# ======================================================
+# CASES
+# ======================================================
+# name -> (setup(size) -> callable, größte sinnvolle Größe)
+def _case_parse(size: int) -> Callable:
+    lines = make_priced_lines(size, make_short_code)
+    return lambda: parse_priced_lines(lines)
+
+
+def _case_normalize(size: int) -> Callable:
+    catalog = make_catalog(size)
+    index = build_option_index(catalog)
+    codes = make_codes(size)
+    lines = make_priced_lines(size)
+    return lambda: normalize_vehicle_input(
+        model="", color="", interior="",
+        all_codes=codes, priced_lines=lines,
+        options_meta=catalog, option_index=index
+    )
+
+
+def _case_pricing(size: int) -> Callable:
+    catalog = make_catalog(size, priced=True)
+    table = PriceTable(catalog)
+    codes = make_codes(size)
+    return lambda: resolve_multiple_options(codes, catalog, "2025-06-30", table)
+
+
+def _case_excel(size: int) -> Callable:
+    data = make_vehicle_data(size)
+    return lambda: build_excel_bytes(data)
+
+
+def _case_pdf(size: int) -> Callable:
+    data = make_vehicle_data(size)
+    return lambda: build_pdf(data)
+
+
+CASES = {
+    "parse_priced_lines": (_case_parse, SIZES["huge"]),
+    "normalize_vehicle_input": (_case_normalize, SIZES["huge"]),
+    "resolve_multiple_options": (_case_pricing, SIZES["huge"]),
+    "build_excel": (_case_excel, SIZES["large"]),
+    "build_pdf": (_case_pdf, SIZES["large"]),
+}
+
+
+# ======================================================
+# RUNNER
+# ======================================================
+def measure(fn: Callable) -> Dict:
+    fn()  # warmup
+
+    timings = []
+    deadline = time.perf_counter() + TIME_BUDGET
+
+    while len(timings) < MAX_RUNS:
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+        if len(timings) >= MIN_RUNS and time.perf_counter() > deadline:
+            break
+
+    return {
+        "best": min(timings),
+        "median": statistics.median(timings),
+        "runs": len(timings),
+    }
+
+
+def run(sizes: List[str], only: Optional[str], max_size: Optional[int]) -> Dict:
+    results = {}
+
+    for name, (setup, case_max) in CASES.items():
+        if only and only not in name:
+            continue
+
+        for size_name in sizes:
+            size = SIZES[size_name]
+            if size > case_max or (max_size and size > max_size):
+                continue
+
+            key = f"{name}@{size_name}"
+            result = measure(setup(size))
+            result["size"] = size
+            results[key] = result
+
+            print(f"{key:<40} {result['best'] * 1e3:>12.3f}ms  (median {result['median'] * 1e3:.3f}ms, {result['runs']} runs)")
+
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+
+        ratio = result["best"] / previous["best"] if previous["best"] else 1.0
+        if ratio > 1.0 + threshold:
+            regressions.append(
+                f"{key}: {previous['best'] * 1e3:.3f}ms -> {result['best'] * 1e3:.3f}ms ({ratio:.2f}x)"
+            )
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="BMW Offer Pilot benchmarks")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="z.B. tiny,small,medium")
+    parser.add_argument("--only", help="nur Fälle, deren Name dies enthält")
+    parser.add_argument("--max-size", type=int, help="größere Eingaben überspringen")
+    parser.add_argument("--output", help="Ergebnisse als JSON speichern")
+    parser.add_argument("--baseline", help="JSON eines früheren Laufs zum Vergleich")
+    parser.add_argument("--threshold", type=float, default=0.2, help="erlaubte Verlangsamung (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    results = run(sizes, args.only, args.max_size)
+
+    if args.output:
+        payload = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"\nErgebnisse gespeichert: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressionen (> {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+
+        print(f"\nKeine Regressionen (Schwelle {args.threshold:.0%})")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pricing import PriceTable
+from vehicle_parser import option_text
+
+logger = logging.getLogger(__name__)
+
+# Bei Änderungen an CatalogSnapshot / CatalogIndex / PriceTable erhöhen
+SNAPSHOT_FORMAT = 2
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# ======================================================
+# COMPILED INDEX
+# ======================================================
+class CatalogIndex:
+    """
+    Kompilierte Form des Katalogs:
+    - jeder Code (und jede Kategorie) interniert, `codes` in Katalogreihenfolge
+    - Anzeigetext (text -> label -> description -> code) einmal aufgelöst
+    - je Kategorie ein Bucket mit den Positionen in `codes` (/debug/catalog)
+    - `entries`: code -> (category, text) für den Normalizer
+    """
+
+    __slots__ = ("codes", "buckets", "entries")
+
+    def __init__(self, options: Dict):
+        codes: List[str] = []
+        buckets: Dict[Optional[str], List[int]] = {}
+        entries: Dict[str, Tuple[Optional[str], str]] = {}
+
+        for code, meta in options.items():
+            if not meta:
+                continue
+
+            code = sys.intern(code)
+            category = _intern(meta.get("category"))
+            text = option_text(meta, code)
+
+            buckets.setdefault(category, []).append(len(codes))
+            codes.append(code)
+            entries[code] = (category, text)
+
+        self.codes = codes
+        self.buckets = buckets
+        self.entries = entries
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+# ======================================================
+# CATALOG SNAPSHOT
+# ======================================================
+class CatalogSnapshot:
+    """
+    Unveränderlicher, geparster Stand von options_meta.json.
+    Wird bei einem Reload komplett ersetzt, nie verändert.
+    """
+
+    __slots__ = ("options", "compiled", "index", "prices", "version", "mtime_ns", "size")
+
+    def __init__(self, options: Dict, version: str, mtime_ns: int, size: int):
+        self.options = options
+        self.version = version
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+        self.compiled = CatalogIndex(options)
+
+        # code -> (category, text) für den Normalizer
+        self.index = self.compiled.entries
+
+        # Preisregeln einmal kompilieren, nicht pro Request
+        self.prices = PriceTable(options)
+
+    def category_counts(self) -> Dict[str, int]:
+        return {str(category): len(ids) for category, ids in self.compiled.buckets.items()}
+
+    def touched(self, mtime_ns: int, size: int) -> "CatalogSnapshot":
+        """Gleicher Inhalt, neue Dateimetadaten -> Index wiederverwenden."""
+        clone = object.__new__(CatalogSnapshot)
+        for name in CatalogSnapshot.__slots__:
+            setattr(clone, name, getattr(self, name))
+        clone.mtime_ns = mtime_ns
+        clone.size = size
+        return clone
+
+
+# ======================================================
+# BINARY SNAPSHOT (PICKLE)
+# ======================================================
+# Nur selbst geschriebene Dateien laden - pickle ist kein Austauschformat.
+def save_snapshot(path: str, snapshot: CatalogSnapshot):
+    """Atomar schreiben: parallele Worker sehen nie eine halbe Datei."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump((SNAPSHOT_FORMAT, snapshot), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.warning("Could not write catalog snapshot %s", path)
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def load_snapshot(path: str) -> Optional[CatalogSnapshot]:
+    try:
+        with open(path, "rb") as f:
+            snapshot_format, snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("Ignoring unreadable catalog snapshot %s", path)
+        return None
+
+    if snapshot_format != SNAPSHOT_FORMAT or not isinstance(snapshot, CatalogSnapshot):
+        return None
+    return snapshot
+
+
+# ======================================================
+# OPTIONS CATALOG (HOT RELOAD)
+# ======================================================
+class OptionsCatalog:
+    """
+    Hält options_meta.json einmal geparst im Speicher.
+
+    Die Datei wird nur neu eingelesen, wenn sich mtime/Größe ändern
+    (geprüft höchstens alle `check_interval` Sekunden) und der Inhalt
+    einen anderen Hash hat. Der Austausch erfolgt atomar: Requests sehen
+    immer entweder den alten oder den neuen Snapshot.
+
+    Mit `snapshot_path` wird der kompilierte Stand zusätzlich als Pickle
+    abgelegt. Beim Start lädt jeder Worker diesen direkt, solange
+    mtime/Größe (oder zumindest der Hash) zur JSON-Datei passen.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0, snapshot_path: Optional[str] = None):
+        self.path = path
+        self.check_interval = check_interval
+        self.snapshot_path = snapshot_path
+
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._next_check = 0.0
+
+        self.reload_count = 0
+        self.reload_errors = 0
+        self.last_load_seconds = 0.0
+        self.total_load_seconds = 0.0
+        self.snapshot_loads = 0
+
+    def load(self) -> CatalogSnapshot:
+        with self._lock:
+            return self._reload(os.stat(self.path))
+
+    def get(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        now = time.monotonic()
+
+        if snapshot is not None and now < self._next_check:
+            return snapshot
+
+        with self._lock:
+            self._next_check = now + self.check_interval
+            snapshot = self._snapshot
+
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                if snapshot is None:
+                    raise
+                # Datei wird gerade ersetzt -> alten Stand weiter nutzen
+                return snapshot
+
+            if (
+                snapshot is not None
+                and snapshot.mtime_ns == stat.st_mtime_ns
+                and snapshot.size == stat.st_size
+            ):
+                return snapshot
+
+            try:
+                return self._reload(stat)
+            except (OSError, ValueError):
+                if snapshot is None:
+                    raise
+                self.reload_errors += 1
+                return snapshot
+
+    def _reload(self, stat: os.stat_result) -> CatalogSnapshot:
+        started = time.perf_counter()
+        current = self._snapshot
+        from_disk = False
+
+        if current is None and self.snapshot_path:
+            current = load_snapshot(self.snapshot_path)
+            from_disk = current is not None
+            if (
+                current is not None
+                and current.mtime_ns == stat.st_mtime_ns
+                and current.size == stat.st_size
+            ):
+                # Start mit fertigem Index: weder JSON noch Hash nötig
+                self.snapshot_loads += 1
+                self.last_load_seconds = time.perf_counter() - started
+                self._snapshot = current
+                return current
+
+        with open(self.path, "rb") as f:
+            raw = f.read()
+
+        version = hashlib.sha1(raw).hexdigest()
+
+        changed = current is None or current.version != version
+        if not changed:
+            # Nur touch / gleicher Inhalt -> kein erneutes Parsen
+            snapshot = current.touched(stat.st_mtime_ns, stat.st_size)
+        else:
+            options = json.loads(raw.decode("utf-8"))
+            snapshot = CatalogSnapshot(options, version, stat.st_mtime_ns, stat.st_size)
+            self.reload_count += 1
+
+            elapsed = time.perf_counter() - started
+            self.last_load_seconds = elapsed
+            self.total_load_seconds += elapsed
+
+        # Pickle nur bei neuem Inhalt neu schreiben - oder einmal beim
+        # Start, wenn die Metadaten der Datei nicht mehr passten
+        if self.snapshot_path and (changed or from_disk):
+            save_snapshot(self.snapshot_path, snapshot)
+
+        self._snapshot = snapshot
+        return snapshot
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            "backend": "memory",
+            "path": self.path,
+            "version": snapshot.version if snapshot else None,
+            "codes": len(snapshot.options) if snapshot else 0,
+            "categories": snapshot.category_counts() if snapshot else {},
+            "priced_codes": len(snapshot.prices) if snapshot else 0,
+            "reload_count": self.reload_count,
+            "reload_errors": self.reload_errors,
+            "last_load_seconds": self.last_load_seconds,
+            "total_load_seconds": self.total_load_seconds,
+            "snapshot_path": self.snapshot_path,
+            "snapshot_loads": self.snapshot_loads,
+        }
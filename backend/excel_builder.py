@@ -1,25 +1,254 @@
 from openpyxl import Workbook
-from openpyxl.styles import Font, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Border, NamedStyle, Side
+from openpyxl.utils import column_index_from_string
 from openpyxl.worksheet.pagebreak import Break
 from datetime import datetime
+from io import BytesIO
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 import os
 
+from quotation import Quotation, as_quotation
 
-def underline(ws, cell):
-    ws[cell].font = Font(underline="single", bold=True)
 
+# ======================================================
+# SHARED STYLES (einmal angelegt, nicht pro Zelle)
+# ======================================================
+UNDERLINE_FONT = Font(underline="single", bold=True)
+THIN_BOTTOM = Border(bottom=Side(style="thin"))
+DOUBLE_BOTTOM = Border(bottom=Side(style="double"))
 
-def bottom_border(ws, row):
-    for col in ["A", "B", "C", "D", "E", "F"]:
-        ws[f"{col}{row}"].border = Border(bottom=Side(style="thin"))
+COLUMNS = ["A", "B", "C", "D", "E", "F"]
+COLUMN_WIDTHS = {"A": 22, "B": 22, "C": 45, "D": 12, "E": 18, "F": 10}
 
+# Spaltennummern der Rahmen-Zeilen (A-F)
+BORDER_COLUMNS = tuple(column_index_from_string(col) for col in COLUMNS)
 
-def double_bottom_border(ws, row):
-    for col in ["A", "B", "C", "D", "E", "F"]:
-        ws[f"{col}{row}"].border = Border(bottom=Side(style="double"))
+# Ab so vielen Options-Zeilen wird im Write-Only-Modus gerendert
+STREAMING_MIN_LINES = int(os.environ.get("EXCEL_STREAMING_MIN_LINES", "2000"))
 
 
-def build_excel(vehicle_data: dict) -> str:
+# ======================================================
+# TEMPLATE DSL
+# ======================================================
+class Field:
+    """Platzhalter für einen Wert, der pro Angebot berechnet wird."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class U(str):
+    """Unterstrichene (und fette) Beschriftung."""
+
+
+TODAY = Field("today")
+BASE_TOTAL = Field("base_total")
+SECURITY_TOTAL = Field("security_total")
+OPTIONAL_TOTAL = Field("optional_total")
+TOTAL_PRICE = Field("total_price")
+
+
+def row(border: Optional[Border] = None, **cells) -> Tuple:
+    return ("row", border, cells)
+
+
+def blank(count: int = 1) -> Tuple:
+    return ("blank", count)
+
+
+def items(category: str) -> Tuple:
+    return ("items", category)
+
+
+def page_break() -> Tuple:
+    return ("break",)
+
+
+# ======================================================
+# LAYOUT (V1.2)
+# ======================================================
+LAYOUT = [
+    # ----- PAGE 1 -----
+    blank(2),
+    row(THIN_BOTTOM),
+    row(A="Quotation", B=TODAY, E="Country"),
+    row(A="Department", B="Sales Person"),
+    row(A="Type", B="X5"),
+    row(A="Protection class", B="VR"),
+    row(A="Top Down", B="Number"),
+    row(A="Model Year", B="YYYY"),
+    row(THIN_BOTTOM, A="Vehicle Status", B="STOCK / TO ORDER"),
+    row(D="Country", E="Page 1"),
+    row(B=U("Option Code"), C=U("Description"), E="Price"),
+
+    row(A=U("Basic Vehicle")),
+    items("base"),
+    row(A=U("Exterior Color")),
+    row(A=U("Interior Color")),
+    row(THIN_BOTTOM, A="Interior Trim"),
+
+    row(A=U("Standard Equipment")),
+    items("standard"),
+    blank(),
+
+    row(A=U("Security Equipment")),
+    items("security"),
+    blank(2),
+
+    # ----- PAGE 2 -----
+    page_break(),
+    row(A="=A8", B="=B8", E="Page 2"),
+    blank(),
+
+    row(A=U("Optional Equipment")),
+    items("optional"),
+    blank(),
+
+    row(A=U("Technical Adjustments")),
+    row(A=U("Editions"), B="Basic Vehicle Price", E=BASE_TOTAL),
+    row(B="Security Package VR6", E=SECURITY_TOTAL),
+    row(B="Optional Equipment", E=OPTIONAL_TOTAL),
+    row(THIN_BOTTOM, B="Technical Adjustment", E=0.0),
+    row(B="(Dropdown)"),
+    row(B="Transportation", E=0.0),
+    row(THIN_BOTTOM, B="Special Discount", E=0.0),
+    # Gesamtpreis: Beschriftung in B wird (wie in V1.2) von "Transportation" belegt
+    row(B="Transportation", E=TOTAL_PRICE),
+    row(THIN_BOTTOM, B="Special Discount"),
+    row(DOUBLE_BOTTOM, B="(Dropdown)"),
+    blank(3),
+
+    # ----- PAGE 4 – TECHNICAL DATA -----
+    page_break(),
+    row(A="=A8", B="=B8", E="Page 4"),
+    blank(),
+
+    row(A=U("Technical Data")),
+    *[
+        row(A=line, C="Text / Number")
+        for line in [
+            "Weight",
+            "Unladen DIN (without Driver) kg",
+            "Unladen EU kg",
+            "Gross vehicle weight kg",
+            "Engine",
+            "Cylinders/valves",
+            "Capacity cc3",
+            "Output/Engine Speed kW(hp) / rpm",
+            "Engine Torque Nm",
+            "Performance",
+            "Top Speed3 km/h",
+            "Acceleration 0-100 km/h s",
+            "Fuel Consumption",
+            "Combined l/100 km",
+            "CO2 emissions g/km",
+        ]
+    ],
+]
+
+
+# ======================================================
+# COMPILED TEMPLATE
+# ======================================================
+# Zelle: (Spaltennummer, Wert | Field, Font | None)
+Cell = Tuple[int, Any, Optional[Font]]
+
+
+class QuotationTemplate:
+    """
+    Das statische Layout, einmal in Segmente kompiliert:
+    feste Zeilen (Spaltennummern, Styles, Texte schon aufgelöst),
+    Leerzeilen, Seitenumbrüche und die variablen Options-Blöcke.
+
+    iter_rows() liefert die Zeilen streng aufsteigend, damit sowohl
+    der normale als auch ein Streaming-Writer sie nutzen können.
+    """
+
+    def __init__(self, layout: List[Tuple]):
+        self.segments = [self._compile(segment) for segment in layout]
+
+    @staticmethod
+    def _compile(segment: Tuple) -> Tuple:
+        if segment[0] != "row":
+            return segment
+
+        _, border, cells = segment
+        compiled = tuple(
+            (
+                column_index_from_string(col),
+                str(value) if isinstance(value, U) else value,
+                UNDERLINE_FONT if isinstance(value, U) else None,
+            )
+            for col, value in cells.items()
+        )
+        return ("row", border, compiled)
+
+    def iter_rows(
+        self,
+        quotation: Quotation,
+        fields: Dict[str, Any]
+    ) -> Iterator[Tuple[int, Tuple[Cell, ...], Optional[Border], bool]]:
+        """
+        Liefert (Zeile, Zellen, Rahmen, Seitenumbruch davor).
+        Leerzeilen werden übersprungen.
+        """
+        current = 1
+        pending_break = False
+
+        for segment in self.segments:
+            kind = segment[0]
+
+            if kind == "row":
+                _, border, cells = segment
+                if any(isinstance(value, Field) for _, value, _ in cells):
+                    cells = tuple(
+                        (col, fields[value.name] if isinstance(value, Field) else value, font)
+                        for col, value, font in cells
+                    )
+                yield current, cells, border, pending_break
+                pending_break = False
+                current += 1
+
+            elif kind == "items":
+                for line in quotation.lines(segment[1]):
+                    yield current, (
+                        (2, line.code, None),
+                        (3, line.text, None),
+                        (5, line.price, None),
+                    ), None, pending_break
+                    pending_break = False
+                    current += 1
+
+            elif kind == "blank":
+                current += segment[1]
+
+            elif kind == "break":
+                pending_break = True
+
+
+TEMPLATE = QuotationTemplate(LAYOUT)
+
+
+def template_fields(quotation: Quotation) -> Dict[str, Any]:
+    # Zwischensummen kommen fertig aus dem Normalizer
+    return {
+        "today": datetime.today().strftime("%d.%m.%Y"),
+        "base_total": quotation.subtotal("base"),
+        "security_total": quotation.subtotal("security"),
+        "optional_total": quotation.subtotal("optional"),
+        "total_price": quotation.total_price,
+    }
+
+
+# ======================================================
+# RENDER
+# ======================================================
+def build_workbook(vehicle_data: Union[Quotation, dict]) -> Workbook:
+    quotation = as_quotation(vehicle_data)
+
     wb = Workbook()
     ws = wb.active
     ws.title = "Quotation"
@@ -27,12 +256,8 @@ def build_excel(vehicle_data: dict) -> str:
     # =========================
     # COLUMNS
     # =========================
-    ws.column_dimensions["A"].width = 22
-    ws.column_dimensions["B"].width = 22
-    ws.column_dimensions["C"].width = 45
-    ws.column_dimensions["D"].width = 12
-    ws.column_dimensions["E"].width = 18
-    ws.column_dimensions["F"].width = 10
+    for col, width in COLUMN_WIDTHS.items():
+        ws.column_dimensions[col].width = width
 
     # =========================
     # PRINT HEADER (ALL PAGES)
@@ -41,216 +266,137 @@ def build_excel(vehicle_data: dict) -> str:
     ws.oddHeader.right.text = "LOGO 2"
 
     # =========================
-    # PAGE 1
+    # ROWS FROM TEMPLATE
     # =========================
-    bottom_border(ws, 3)
-
-    ws["A4"] = "Quotation"
-    ws["B4"] = datetime.today().strftime("%d.%m.%Y")
-    ws["E4"] = "Country"
-
-    ws["A5"] = "Department"
-    ws["B5"] = "Sales Person"
-
-    ws["A6"] = "Type"
-    ws["B6"] = "X5"
-
-    ws["A7"] = "Protection class"
-    ws["B7"] = "VR"
-
-    ws["A8"] = "Top Down"
-    ws["B8"] = "Number"
+    fields = template_fields(quotation)
+    cell = ws.cell
+
+    for row_idx, cells, border, page_break_before in TEMPLATE.iter_rows(quotation, fields):
+        if page_break_before:
+            ws.row_breaks.append(Break(id=row_idx))
+
+        for col, value, font in cells:
+            target = cell(row=row_idx, column=col, value=value)
+            if font is not None:
+                target.font = font
+
+        if border is not None:
+            for col in BORDER_COLUMNS:
+                cell(row=row_idx, column=col).border = border
+
+    return wb
+
+
+# ======================================================
+# STREAMING RENDER (WRITE-ONLY)
+# ======================================================
+# Named Styles für den Write-Only-Modus: (Font, Border) -> Name
+NAMED_STYLES = {
+    (UNDERLINE_FONT, None): "Quotation Label",
+    (None, THIN_BOTTOM): "Quotation Rule",
+    (None, DOUBLE_BOTTOM): "Quotation Double Rule",
+    (UNDERLINE_FONT, THIN_BOTTOM): "Quotation Label Rule",
+    (UNDERLINE_FONT, DOUBLE_BOTTOM): "Quotation Label Double Rule",
+}
+
+
+def _register_named_styles(wb: Workbook) -> Dict[Tuple, str]:
+    names = {}
+    for (font, border), name in NAMED_STYLES.items():
+        style = NamedStyle(name=name)
+        if font is not None:
+            style.font = font
+        if border is not None:
+            style.border = border
+        wb.add_named_style(style)
+        names[(id(font), id(border))] = name
+    return names
+
+
+def build_streaming_workbook(vehicle_data: Union[Quotation, dict]) -> Workbook:
+    """
+    Gleiches Layout wie build_workbook, aber mit openpyxl write_only:
+    Zeilen werden direkt in den Sheet-Stream geschrieben, im Speicher
+    liegt immer nur die aktuelle Zeile. Styles laufen über vorab
+    registrierte Named Styles statt über Zell-Objekte.
+    """
+    quotation = as_quotation(vehicle_data)
+
+    wb = Workbook(write_only=True)
+    style_names = _register_named_styles(wb)
+    ws = wb.create_sheet("Quotation")
+
+    # Spaltenbreiten / Kopfzeile müssen vor der ersten Zeile stehen
+    for col, width in COLUMN_WIDTHS.items():
+        ws.column_dimensions[col].width = width
 
-    ws["A9"] = "Model Year"
-    ws["B9"] = "YYYY"
+    ws.oddHeader.left.text = "LOGO 1"
+    ws.oddHeader.right.text = "LOGO 2"
 
-    ws["A10"] = "Vehicle Status"
-    ws["B10"] = "STOCK / TO ORDER"
+    fields = template_fields(quotation)
+    written = 0
 
-    bottom_border(ws, 10)
+    for row_idx, cells, border, page_break_before in TEMPLATE.iter_rows(quotation, fields):
+        while written < row_idx - 1:
+            ws.append([])
+            written += 1
 
-    ws["D11"] = "Country"
-    ws["E11"] = "Page 1"
+        if page_break_before:
+            ws.row_breaks.append(Break(id=row_idx))
 
-    ws["B12"] = "Option Code"
-    ws["C12"] = "Description"
-    ws["E12"] = "Price"
+        values: Dict[int, Any] = {col: (value, font) for col, value, font in cells}
+        last_col = BORDER_COLUMNS[-1] if border is not None else max(values, default=0)
+        line = []
 
-    underline(ws, "B12")
-    underline(ws, "C12")
+        for col in range(1, last_col + 1):
+            value, font = values.get(col, (None, None))
+            cell_border = border if col in BORDER_COLUMNS else None
 
-    row = 13
+            if font is None and cell_border is None:
+                line.append(value)
+                continue
 
-    # ----- BASIC VEHICLE -----
-    ws[f"A{row}"] = "Basic Vehicle"
-    underline(ws, f"A{row}")
-    row += 1
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style_names[(id(font), id(cell_border))]
+            line.append(cell)
 
-    # Write actual base vehicle data
-    for item in vehicle_data.get("base", []):
-        ws[f"B{row}"] = item.get("code", "")
-        ws[f"C{row}"] = item.get("text", "")
-        ws[f"E{row}"] = item.get("price", 0.0)
-        row += 1
+        ws.append(line)
+        written += 1
 
-    ws[f"A{row}"] = "Exterior Color"
-    underline(ws, f"A{row}")
-    row += 1
+    return wb
 
-    ws[f"A{row}"] = "Interior Color"
-    underline(ws, f"A{row}")
-    row += 1
 
-    ws[f"A{row}"] = "Interior Trim"
-    row += 1
+def build_excel_workbook(vehicle_data: Union[Quotation, dict], streaming: Optional[bool] = None) -> Workbook:
+    """
+    streaming=None wählt ab STREAMING_MIN_LINES Zeilen automatisch
+    den Write-Only-Renderer.
+    """
+    quotation = as_quotation(vehicle_data)
 
-    bottom_border(ws, row - 1)
+    if streaming is None:
+        streaming = quotation.line_count() >= STREAMING_MIN_LINES
 
-    # ----- STANDARD EQUIPMENT -----
-    ws[f"A{row}"] = "Standard Equipment"
-    underline(ws, f"A{row}")
-    row += 1
+    if streaming:
+        return build_streaming_workbook(quotation)
+    return build_workbook(quotation)
 
-    # Write actual standard equipment data
-    for item in vehicle_data.get("standard", []):
-        ws[f"B{row}"] = item.get("code", "")
-        ws[f"C{row}"] = item.get("text", "")
-        ws[f"E{row}"] = item.get("price", 0.0)
-        row += 1
 
-    row += 1
+def workbook_bytes(wb: Workbook) -> bytes:
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
 
-    # ----- SECURITY EQUIPMENT -----
-    ws[f"A{row}"] = "Security Equipment"
-    underline(ws, f"A{row}")
-    row += 1
 
-    # Write actual security equipment data
-    for item in vehicle_data.get("security", []):
-        ws[f"B{row}"] = item.get("code", "")
-        ws[f"C{row}"] = item.get("text", "")
-        ws[f"E{row}"] = item.get("price", 0.0)
-        row += 1
+def build_excel_bytes(vehicle_data: Union[Quotation, dict], streaming: Optional[bool] = None) -> bytes:
+    """
+    Rendert das Angebot komplett im Speicher (kein output/-Verzeichnis),
+    damit parallele Requests sich nicht gegenseitig überschreiben.
+    """
+    return workbook_bytes(build_excel_workbook(vehicle_data, streaming))
 
-    row += 2
 
-    # =========================
-    # PAGE 2
-    # =========================
-    ws.row_breaks.append(Break(id=row))
-
-    ws[f"A{row}"] = "=A8"
-    ws[f"B{row}"] = "=B8"
-    ws[f"E{row}"] = "Page 2"
-    row += 2
-
-    ws[f"A{row}"] = "Optional Equipment"
-    underline(ws, f"A{row}")
-    row += 1
-
-    # Write actual optional equipment data
-    for item in vehicle_data.get("optional", []):
-        ws[f"B{row}"] = item.get("code", "")
-        ws[f"C{row}"] = item.get("text", "")
-        ws[f"E{row}"] = item.get("price", 0.0)
-        row += 1
-
-    row += 1
-
-    ws[f"A{row}"] = "Technical Adjustments"
-    underline(ws, f"A{row}")
-    row += 1
-
-    ws[f"A{row}"] = "Editions"
-    underline(ws, f"A{row}")
-    # Calculate subtotals
-    base_total = sum(item.get("price", 0) for item in vehicle_data.get("base", []))
-    security_total = sum(item.get("price", 0) for item in vehicle_data.get("security", []))
-    optional_total = sum(item.get("price", 0) for item in vehicle_data.get("optional", []))
-    
-    ws[f"B{row}"] = "Basic Vehicle Price"
-    ws[f"E{row}"] = base_total
-    row += 1
-
-    ws[f"B{row}"] = "Security Package VR6"
-    ws[f"E{row}"] = security_total
-    row += 1
-
-    ws[f"B{row}"] = "Optional Equipment"
-    ws[f"E{row}"] = optional_total
-    row += 1
-
-    ws[f"B{row}"] = "Technical Adjustment"
-    ws[f"E{row}"] = 0.0
-    row += 0
-
-    bottom_border(ws, row)
-    row += 1
-
-    ws[f"B{row}"] = "(Dropdown)"
-    row += 1
-
-    ws[f"B{row}"] = "Transportation"
-    ws[f"E{row}"] = 0.0
-    row += 1
-
-    ws[f"B{row}"] = "Special Discount"
-    ws[f"E{row}"] = 0.0
-    bottom_border(ws, row)
-    row += 1
-
-    # Total price
-    total = vehicle_data.get("total_price", 0.0)
-    ws[f"B{row}"] = "Total Price"
-    ws[f"E{row}"] = total
-
-    ws[f"B{row}"] = "Transportation"
-    row += 1
-
-    ws[f"B{row}"] = "Special Discount"
-    bottom_border(ws, row)
-    row += 1
-
-    ws[f"B{row}"] = "(Dropdown)"
-    double_bottom_border(ws, row)
-    row += 4
-
-    # =========================
-    # PAGE 4 – TECHNICAL DATA
-    # =========================
-    ws.row_breaks.append(Break(id=row))
-
-    ws[f"A{row}"] = "=A8"
-    ws[f"B{row}"] = "=B8"
-    ws[f"E{row}"] = "Page 4"
-    row += 2
-
-    ws[f"A{row}"] = "Technical Data"
-    underline(ws, f"A{row}")
-    row += 1
-
-    technical_lines = [
-        "Weight",
-        "Unladen DIN (without Driver) kg",
-        "Unladen EU kg",
-        "Gross vehicle weight kg",
-        "Engine",
-        "Cylinders/valves",
-        "Capacity cc3",
-        "Output/Engine Speed kW(hp) / rpm",
-        "Engine Torque Nm",
-        "Performance",
-        "Top Speed3 km/h",
-        "Acceleration 0-100 km/h s",
-        "Fuel Consumption",
-        "Combined l/100 km",
-        "CO2 emissions g/km"
-    ]
-
-    for line in technical_lines:
-        ws[f"A{row}"] = line
-        ws[f"C{row}"] = "Text / Number"
-        row += 1
+def build_excel(vehicle_data: Union[Quotation, dict]) -> str:
+    wb = build_workbook(vehicle_data)
 
     # =========================
     # SAVE
@@ -0,0 +1,276 @@
+import json
+import logging
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_TIMEOUT = 5.0
+
+
+class QueueFullError(Exception):
+    pass
+
+
+# ======================================================
+# WEBHOOKS (NUR ERLAUBTE HOSTS)
+# ======================================================
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Weiterleitungen könnten die Host-Prüfung umgehen
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_webhook_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def check_callback_url(url: str, allowed_hosts: Iterable[str]):
+    """
+    Nur http/https an explizit erlaubte Hosts (WEBHOOK_ALLOWED_HOSTS),
+    sonst ValueError. Ohne erlaubte Hosts sind Webhooks aus.
+    """
+    allowed = {host.lower() for host in allowed_hosts}
+    if not allowed:
+        raise ValueError("Webhooks are disabled (set WEBHOOK_ALLOWED_HOSTS)")
+
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise ValueError("callback_url must use http or https")
+    if (parts.hostname or "").lower() not in allowed:
+        raise ValueError(f"callback_url host not allowed: {parts.hostname}")
+
+
+# ======================================================
+# JOB
+# ======================================================
+class Job:
+    __slots__ = (
+        "id", "status", "filename", "media_type", "content", "error",
+        "callback_url", "result_url", "created_at", "started_at", "finished_at",
+    )
+
+    def __init__(self, filename: str, media_type: str, callback_url: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"  # queued | running | done | failed
+        self.filename = filename
+        self.media_type = media_type
+        self.content: Optional[bytes] = None
+        self.error: Optional[str] = None
+        self.callback_url = callback_url
+        self.result_url: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> Dict:
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "done":
+            data["result_url"] = self.result_url
+            data["size"] = len(self.content)
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+# ======================================================
+# JOB QUEUE (IN-PROCESS, BEGRENZT)
+# ======================================================
+class JobQueue:
+    """
+    In-Process-Warteschlange für Angebots-Generierung.
+
+    Höchstens `workers` Jobs laufen gleichzeitig, höchstens
+    `max_pending` warten. Ist die Schlange voll, wirft submit()
+    QueueFullError (-> 429 statt Timeout). Fertige Ergebnisse werden
+    nach `result_ttl` Sekunden verworfen, bei mehr als
+    `max_result_bytes` zusätzlich die ältesten zuerst.
+
+    Webhooks gehen nur an `allowed_hosts` und laufen in einem eigenen
+    Thread, damit ein langsamer Empfänger keinen Job-Worker blockiert.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        result_ttl: float,
+        max_result_bytes: int = 256 * 1024 * 1024,
+        allowed_hosts: Iterable[str] = ()
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.max_result_bytes = max_result_bytes
+        self.allowed_hosts = frozenset(host.lower() for host in allowed_hosts)
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._webhooks = ThreadPoolExecutor(max_workers=2, thread_name_prefix="webhook")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._active = 0
+        self._result_bytes = 0
+
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+        self.evicted = 0
+
+    def submit(
+        self,
+        render: Callable[[], bytes],
+        *,
+        filename: str,
+        media_type: str,
+        callback_url: Optional[str] = None,
+        result_url_for: Optional[Callable[[str], str]] = None
+    ) -> Job:
+        if callback_url:
+            check_callback_url(callback_url, self.allowed_hosts)
+
+        with self._lock:
+            self._purge()
+
+            if self._active >= self.workers + self.max_pending:
+                self.rejected += 1
+                raise QueueFullError("Job queue is full")
+
+            job = Job(filename, media_type, callback_url)
+            if result_url_for is not None:
+                job.result_url = result_url_for(job.id)
+            self._jobs[job.id] = job
+            self._active += 1
+            self.submitted += 1
+
+        self._executor.submit(self._run, job, render)
+        return job
+
+    def add_result(
+        self,
+        content: bytes,
+        *,
+        filename: str,
+        media_type: str,
+        callback_url: Optional[str] = None,
+        result_url_for: Optional[Callable[[str], str]] = None
+    ) -> Job:
+        """Fertiges Ergebnis (z.B. Cache-Treffer) direkt als "done" ablegen, ohne Worker."""
+        if callback_url:
+            check_callback_url(callback_url, self.allowed_hosts)
+
+        job = Job(filename, media_type, callback_url)
+        job.status = "done"
+        job.content = content
+        job.started_at = job.finished_at = job.created_at
+
+        with self._lock:
+            self._purge()
+            if result_url_for is not None:
+                job.result_url = result_url_for(job.id)
+            self._jobs[job.id] = job
+            self.submitted += 1
+            self._result_bytes += len(content)
+            self._evict()
+
+        if callback_url:
+            self._webhooks.submit(self._notify, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, render: Callable[[], bytes]):
+        job.status = "running"
+        job.started_at = time.time()
+
+        try:
+            job.content = render()
+            job.status = "done"
+        except Exception as exc:
+            logger.exception("Job %s failed", job.id)
+            job.error = str(exc) or exc.__class__.__name__
+            job.status = "failed"
+            self.failed += 1
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active -= 1
+                if job.content is not None:
+                    self._result_bytes += len(job.content)
+                    self._evict()
+
+        if job.callback_url:
+            self._webhooks.submit(self._notify, job)
+
+    def _notify(self, job: Job):
+        payload = json.dumps(job.to_dict()).encode("utf-8")
+        request = urllib.request.Request(
+            job.callback_url,
+            data=payload,
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            check_callback_url(job.callback_url, self.allowed_hosts)
+            with _webhook_opener.open(request, timeout=WEBHOOK_TIMEOUT):
+                pass
+        except Exception:
+            logger.warning("Webhook for job %s failed: %s", job.id, job.callback_url)
+
+    def _remove(self, job_id: str):
+        job = self._jobs.pop(job_id)
+        if job.content is not None:
+            self._result_bytes -= len(job.content)
+
+    def _purge(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            self._remove(job_id)
+
+    def _evict(self):
+        # Älteste fertige Ergebnisse zuerst (dict = Einfügereihenfolge)
+        if self._result_bytes <= self.max_result_bytes:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.content is not None]:
+            self._remove(job_id)
+            self.evicted += 1
+            if self._result_bytes <= self.max_result_bytes:
+                break
+
+    def stats(self) -> Dict:
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.status == "queued")
+            running = sum(1 for job in self._jobs.values() if job.status == "running")
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queued": queued,
+            "running": running,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "evicted": self.evicted,
+            "result_bytes": self._result_bytes,
+            "max_result_bytes": self.max_result_bytes,
+            "webhooks": bool(self.allowed_hosts),
+        }
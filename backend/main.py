@@ -1,21 +1,45 @@
+import asyncio
 import os
-import json
-from typing import List
+import zipfile
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Iterator, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from openpyxl.utils.exceptions import InvalidFileException
 from pydantic import BaseModel
 
-from vehicle_parser import normalize_vehicle_input
-from excel_builder import build_excel
-# from pdf_builder import build_pdf   # später aktivieren
+from admission import AdmissionController, AdmissionRejected
+from archive import iter_zip
+from cache import QuotationCache, canonical_key
+from catalog import CatalogSnapshot, OptionsCatalog
+from jobs import JobQueue, QueueFullError, check_callback_url
+from metrics import MetricsMiddleware, record_parse_stats, record_stages, registry, stage
+from price_import import ImportedPriceList, import_price_file
+from price_store import PriceStore, PriceStoreError, open_price_store
+from profiling import ProfileStore
+from quotation import Quotation
+from rendering import RenderExecutor
+from shared_catalog import SharedCatalog
+from vehicle_parser import ParseStats, aparse_priced_lines, normalize_vehicle_input, parse_priced_lines
 
 
 # ======================================================
 # APP
 # ======================================================
-app = FastAPI(title="BMW Offer Pilot API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Render-Worker vorab starten, beim Beenden sauber herunterfahren
+    await run_in_threadpool(render_executor.warm)
+    yield
+    render_executor.shutdown()
+
+
+app = FastAPI(title="BMW Offer Pilot API", lifespan=lifespan)
 
 # CORS - Erlaube Frontend-Zugriff
 app.add_middleware(
@@ -29,20 +53,81 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "X-Rejected-Lines", "X-Profile-Id", "Retry-After"],
 )
 
+# Dauer / Größe / Status je Route, Stufen-Zeiten -> /metrics
+app.add_middleware(MetricsMiddleware)
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
+# ======================================================
+# CONFIG
+# ======================================================
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "500"))
+RENDER_EXECUTOR = os.environ.get("RENDER_EXECUTOR", "process")  # process | thread | inline
+# Jeder Worker ist ein eigener Prozess mit geladenen Renderern; GENERATE_MAX_IN_FLIGHT skaliert mit
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", str(min(2, os.cpu_count() or 1))))
+RENDER_MAX_TASKS_PER_WORKER = int(os.environ.get("RENDER_MAX_TASKS_PER_WORKER", "200"))
+RENDER_MP_CONTEXT = os.environ.get("RENDER_MP_CONTEXT") or None  # fork | spawn | forkserver
+UPLOAD_CHUNK_SIZE = 64 * 1024
+QUOTE_CACHE_MAX_BYTES = int(os.environ.get("QUOTE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUOTE_CACHE_TTL = float(os.environ.get("QUOTE_CACHE_TTL", "300"))
+GENERATE_MAX_IN_FLIGHT = int(os.environ.get("GENERATE_MAX_IN_FLIGHT", str(RENDER_WORKERS * 2)))  # 0 = aus
+GENERATE_MAX_QUEUE = int(os.environ.get("GENERATE_MAX_QUEUE", "50"))
+GENERATE_QUEUE_TIMEOUT = float(os.environ.get("GENERATE_QUEUE_TIMEOUT", "15"))
+GENERATE_RETRY_AFTER = int(os.environ.get("GENERATE_RETRY_AFTER", "2"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", "50"))
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", "600"))
+JOB_RESULT_MAX_BYTES = int(os.environ.get("JOB_RESULT_MAX_BYTES", str(256 * 1024 * 1024)))
+# Webhooks nur an diese Hosts (kommagetrennt); leer = callback_url abgelehnt
+WEBHOOK_ALLOWED_HOSTS = [
+    host.strip() for host in os.environ.get("WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()
+]
+CATALOG_BACKEND = os.environ.get("CATALOG_BACKEND", "memory")  # memory | mmap
+CATALOG_MMAP_PATH = os.environ.get(
+    "CATALOG_MMAP_PATH", os.path.join(BASE_DIR, "options_meta.catalog")
+)
+# Kompilierter Katalog als Pickle ("" = aus), nur Backend "memory"
+CATALOG_SNAPSHOT = os.environ.get(
+    "CATALOG_SNAPSHOT", os.path.join(BASE_DIR, "options_meta.snapshot")
+)
+PRICE_STORE = os.environ.get("PRICE_STORE", os.path.join(BASE_DIR, "prices.sqlite"))
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_MAX_STORED = int(os.environ.get("PROFILE_MAX_STORED", "20"))
+
+
 # ======================================================
 # HEALTH CHECK
 # ======================================================
+# Läuft direkt auf dem Event-Loop: bleibt schnell, auch wenn alle
+# Render-Worker beschäftigt sind (Render-Healthcheck)
 @app.get("/")
-def health_check():
+async def health_check():
     return {
         "status": "online",
         "service": "BMW Offer Pilot API",
-        "endpoints": ["/generate", "/debug/parse", "/docs"]
+        "endpoints": [
+            "/generate",
+            "/generate/batch",
+            "/generate/stream",
+            "/generate/import",
+            "/import/parse",
+            "/jobs",
+            "/pricing/matrix",
+            "/debug/parse",
+            "/debug/catalog",
+            "/debug/prices",
+            "/debug/cache",
+            "/debug/jobs",
+            "/debug/render",
+            "/debug/admission",
+            "/debug/profiles",
+            "/metrics",
+            "/docs",
+        ]
     }
 
 
@@ -59,68 +144,851 @@ class GenerateRequest(BaseModel):
     format: str  # "excel" | "pdf"
 
 
+class JobRequest(GenerateRequest):
+    callback_url: Optional[str] = None
+
+
+class BatchGenerateRequest(BaseModel):
+    requests: List[GenerateRequest]
+
+
+class PriceMatrixRequest(BaseModel):
+    dates: List[str]
+    codes: List[str] = []
+    configurations: List[List[str]] = []
+
+
 # ======================================================
 # LOAD OPTIONS META
 # ======================================================
+# Einmal beim Start laden, danach nur bei geänderter Datei neu einlesen
+# Backend "mmap": eine gemeinsame Binärdatei für alle uvicorn-Worker
+if CATALOG_BACKEND == "mmap":
+    catalog = SharedCatalog(os.path.join(BASE_DIR, "options_meta.json"), CATALOG_MMAP_PATH)
+else:
+    catalog = OptionsCatalog(
+        os.path.join(BASE_DIR, "options_meta.json"),
+        snapshot_path=CATALOG_SNAPSHOT or None
+    )
+catalog.load()
+
+# Versionierte Preislisten (price_store.py); ohne Datei nur priced_lines
+price_store = open_price_store(PRICE_STORE)
+
+
+def active_price_store() -> Optional[PriceStore]:
+    # Datei wird pro Abfrage geprüft: Import per CLI wirkt ohne Neustart
+    if price_store is None or not price_store.exists():
+        return None
+    return price_store
+
+
+def price_store_unavailable(exc: PriceStoreError) -> HTTPException:
+    return HTTPException(status_code=503, detail=f"Price store unavailable: {exc}")
+
+
 def load_options():
-    path = os.path.join(BASE_DIR, "options_meta.json")
-    with open(path, encoding="utf-8") as f:
-        return json.load(f)
+    return catalog.get().options
 
 
-# ======================================================
-# DEBUG PARSER (SEHR WICHTIG)
-# ======================================================
-@app.post("/debug/parse")
-def debug_parse(req: GenerateRequest):
-    options_meta = load_options()
+def resolve_prices(date_str: str, codes: List[str], priced_prices: dict) -> dict:
+    """
+    Preise aus dem Preislisten-Store zum Angebotsdatum (eine Abfrage
+    für die ganze Konfiguration). Eingefügte priced_lines überschreiben.
+    """
+    store = active_price_store()
+    if store is None or not date_str:
+        return priced_prices
+
+    try:
+        with stage("prices"):
+            prices = store.prices_for(codes, date_str)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {date_str}")
+    except PriceStoreError as exc:
+        raise price_store_unavailable(exc)
+
+    prices.update(priced_prices)
+    return prices
+
 
-    parsed = normalize_vehicle_input(
+def parse_request(
+    req: GenerateRequest,
+    snapshot: Optional[CatalogSnapshot] = None,
+    priced_prices: Optional[dict] = None,
+    parse_stats: Optional[ParseStats] = None
+) -> Quotation:
+    if snapshot is None:
+        snapshot = catalog.get()
+
+    if priced_prices is None:
+        priced_prices = parse_priced_lines(req.priced_lines, parse_stats)
+        if parse_stats is not None:
+            record_parse_stats(parse_stats)
+        priced_prices = resolve_prices(req.date, req.all_codes, priced_prices)
+
+    return normalize_vehicle_input(
         model=req.model,
         color=req.color,
         interior=req.interior,
         all_codes=req.all_codes,
-        priced_lines=req.priced_lines,
-        options_meta=options_meta
+        options_meta=snapshot.options,
+        option_index=snapshot.index,
+        priced_prices=priced_prices
     )
 
-    return parsed
+
+@app.get("/debug/catalog")
+async def debug_catalog():
+    return catalog.stats()
+
+
+@app.get("/debug/prices")
+def debug_prices():
+    store = active_price_store()
+    if store is None:
+        return {"enabled": False, "path": PRICE_STORE}
+    try:
+        return {"enabled": True, **store.stats(), "lists": store.lists()}
+    except PriceStoreError as exc:
+        raise price_store_unavailable(exc)
+
+
+# ======================================================
+# PROFILING (OPT-IN)
+# ======================================================
+# Nur mit PROFILING_ENABLED=1; dann pro Request per Header
+# "X-Profile: 1" oder Query "?profile=1" einschaltbar.
+profiles = ProfileStore(PROFILE_MAX_STORED)
+
+
+def profiling_requested(request: Request) -> bool:
+    if not PROFILING_ENABLED:
+        return False
+    return request.headers.get("x-profile") == "1" or request.query_params.get("profile") == "1"
+
+
+def check_profiling_enabled():
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILING_ENABLED=1)")
+
+
+@app.get("/debug/profiles")
+async def debug_profiles():
+    check_profiling_enabled()
+    return profiles.list()
+
+
+@app.get("/debug/profiles/{profile_id}")
+def debug_profile(profile_id: str, format: str = "text", sort: str = "cumulative", limit: int = 60):
+    """format=text -> pstats-Tabelle, format=pstats -> .prof-Datei (snakeviz, pstats)."""
+    check_profiling_enabled()
+
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Unknown profile")
+
+    if format == "pstats":
+        return Response(
+            content=profile.pstats_bytes(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile.id}.prof"'}
+        )
+
+    try:
+        return Response(profile.text(sort, limit), media_type="text/plain")
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}")
+
+
+# ======================================================
+# DEBUG PARSER (SEHR WICHTIG)
+# ======================================================
+def parse_profiled(req: GenerateRequest, parse_stats: ParseStats):
+    with profiles.record("/debug/parse") as profile:
+        parsed = parse_request(req, parse_stats=parse_stats)
+    return parsed, profile
+
+
+@app.post("/debug/parse")
+async def debug_parse(req: GenerateRequest, request: Request, response: Response):
+    parse_stats = ParseStats()
+
+    if profiling_requested(request):
+        # cProfile + Parsen + SQLite im Threadpool, nicht auf dem Event-Loop
+        parsed, profile = await run_in_threadpool(parse_profiled, req, parse_stats)
+        response.headers["X-Profile-Id"] = profile.id
+    else:
+        parsed = await run_in_threadpool(parse_request, req, parse_stats=parse_stats)
+
+    response.headers["X-Rejected-Lines"] = str(parse_stats.rejected)
+    return parsed.to_dict()
 
 
 # ======================================================
 # GENERATE EXCEL / PDF
 # ======================================================
+# format -> (Dateiname, Media-Type)
+OUTPUT_FORMATS = {
+    "excel": (
+        "BMW_Quotation.xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
+    "pdf": (
+        "BMW_Quotation.pdf",
+        "application/pdf",
+    ),
+    # Excel + PDF aus einem Parse-Durchlauf, als ZIP
+    "bundle": (
+        "BMW_Quotation.zip",
+        "application/zip",
+    ),
+}
+
+BUNDLE_FORMATS = ["excel", "pdf"]
+
+
+def check_format(fmt: str) -> str:
+    fmt = fmt.lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format (use {', '.join(repr(f) for f in OUTPUT_FORMATS)})"
+        )
+    return fmt
+
+
+render_executor = RenderExecutor(
+    RENDER_EXECUTOR,
+    workers=RENDER_WORKERS,
+    max_tasks_per_worker=RENDER_MAX_TASKS_PER_WORKER,
+    mp_context=RENDER_MP_CONTEXT,
+    on_timings=lambda fmt, timings: record_stages(timings)
+)
+
+# Für Profile: Rendern im Request-Thread, damit cProfile es sieht
+inline_executor = RenderExecutor("inline", workers=1)
+
+
+def render_bundle(parsed: Quotation, executor: RenderExecutor) -> bytes:
+    """Excel und PDF parallel rendern, Ergebnis als ein ZIP."""
+    futures = [(fmt, executor.submit(fmt, parsed)) for fmt in BUNDLE_FORMATS]
+
+    entries = [(OUTPUT_FORMATS[fmt][0], future.result()) for fmt, future in futures]
+    return b"".join(iter_zip(entries))
+
+
+def render_quotation(parsed: Quotation, fmt: str, executor: Optional[RenderExecutor] = None) -> bytes:
+    executor = executor or render_executor
+    if fmt == "bundle":
+        return render_bundle(parsed, executor)
+    return executor.render(fmt, parsed)
+
+
+async def arender_quotation(parsed: Quotation, fmt: str) -> bytes:
+    """
+    Wie render_quotation, aber für async-Handler: gerendert wird im
+    Render-Executor (RENDER_WORKERS), der Handler wartet per
+    asyncio.wrap_future, ohne einen Thread zu blockieren.
+    """
+    if render_executor.mode == "inline":
+        # "inline" würde sonst auf dem Event-Loop rendern
+        return await run_in_threadpool(render_quotation, parsed, fmt)
+
+    if fmt == "bundle":
+        futures = [asyncio.wrap_future(render_executor.submit(item_fmt, parsed)) for item_fmt in BUNDLE_FORMATS]
+        contents = await asyncio.gather(*futures)
+        names = [OUTPUT_FORMATS[item_fmt][0] for item_fmt in BUNDLE_FORMATS]
+        return b"".join(iter_zip(zip(names, contents)))
+
+    return await asyncio.wrap_future(render_executor.submit(fmt, parsed))
+
+
+# ======================================================
+# ADMISSION CONTROL
+# ======================================================
+# Begrenzt gleichzeitige Renders (/generate, /generate/stream,
+# /generate/import, Batch-ZIPs und Jobs); Überlast -> 429 / 503 mit
+# Retry-After statt OOM
+admission = AdmissionController(
+    GENERATE_MAX_IN_FLIGHT,
+    GENERATE_MAX_QUEUE,
+    GENERATE_QUEUE_TIMEOUT,
+    retry_after=GENERATE_RETRY_AFTER
+)
+
+
+@asynccontextmanager
+async def render_slot():
+    try:
+        with stage("queue"):
+            await admission.acquire()
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=exc.status_code,
+            detail=exc.detail,
+            headers={"Retry-After": str(exc.retry_after)}
+        )
+
+    try:
+        yield
+    finally:
+        admission.release()
+
+
+@app.get("/debug/admission")
+async def debug_admission():
+    return admission.stats()
+
+
+@app.get("/debug/render")
+async def debug_render():
+    return render_executor.stats()
+
+
+def file_response(
+    content: bytes,
+    fmt: str,
+    cache_status: Optional[str] = None,
+    parse_stats: Optional[ParseStats] = None
+) -> Response:
+    filename, media_type = OUTPUT_FORMATS[fmt]
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if cache_status:
+        headers["X-Cache"] = cache_status
+    if parse_stats is not None:
+        # Nicht erkannte Preiszeilen -> Frontend kann warnen statt still zu verwerfen
+        headers["X-Rejected-Lines"] = str(parse_stats.rejected)
+
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+# ======================================================
+# QUOTATION CACHE
+# ======================================================
+quotation_cache = QuotationCache(QUOTE_CACHE_MAX_BYTES, QUOTE_CACHE_TTL)
+
+
+def quotation_cache_key(req: GenerateRequest, priced_prices: dict, version: str) -> str:
+    """
+    Alles, was das Ergebnis beeinflusst:
+    - all_codes in Eingabereihenfolge (bestimmt die Zeilenreihenfolge)
+    - priced_lines als geparste, nach Code sortierte Preise
+    - Katalogstand und Renderdatum (Datum in Zelle B4)
+    """
+    return canonical_key({
+        "format": req.format.lower(),
+        "date": req.date,
+        "model": req.model,
+        "color": req.color,
+        "interior": req.interior,
+        "all_codes": req.all_codes,
+        "prices": sorted(priced_prices.items()),
+        "catalog": version,
+        "rendered_on": date.today().isoformat(),
+    })
+
+
+@app.get("/debug/cache")
+async def debug_cache():
+    return quotation_cache.stats()
+
+
+def generate_profiled(req: GenerateRequest, fmt: str) -> Response:
+    # Ohne Cache und komplett in einem Thread profilieren (nicht auf dem Event-Loop)
+    parse_stats = ParseStats()
+    with profiles.record(f"/generate {fmt}") as profile:
+        content = render_quotation(parse_request(req, parse_stats=parse_stats), fmt, inline_executor)
+
+    response = file_response(content, fmt, parse_stats=parse_stats)
+    response.headers["X-Profile-Id"] = profile.id
+    return response
+
+
 @app.post("/generate")
-def generate(req: GenerateRequest):
-    options_meta = load_options()
+async def generate(req: GenerateRequest, request: Request):
+    fmt = check_format(req.format)
+    request.state.format = fmt
 
-    parsed = normalize_vehicle_input(
-        model=req.model,
-        color=req.color,
-        interior=req.interior,
-        all_codes=req.all_codes,
-        priced_lines=req.priced_lines,
-        options_meta=options_meta
+    if profiling_requested(request):
+        async with render_slot():
+            return await run_in_threadpool(generate_profiled, req, fmt)
+
+    with stage("catalog"):
+        snapshot = catalog.get()
+    parse_stats = ParseStats()
+    with stage("parse"):
+        priced_prices = parse_priced_lines(req.priced_lines, parse_stats)
+    record_parse_stats(parse_stats)
+    # Key enthält die aufgelösten Preise -> neue Preisliste = neuer Key
+    priced_prices = await run_in_threadpool(resolve_prices, req.date, req.all_codes, priced_prices)
+    cache_key = quotation_cache_key(req, priced_prices, snapshot.version)
+
+    content = quotation_cache.get(cache_key)
+    if content is not None:
+        return file_response(content, fmt, cache_status="HIT", parse_stats=parse_stats)
+
+    async with render_slot():
+        with stage("normalize"):
+            parsed = parse_request(req, snapshot, priced_prices)
+        content = await arender_quotation(parsed, fmt)
+    quotation_cache.put(cache_key, content)
+
+    return file_response(content, fmt, cache_status="MISS", parse_stats=parse_stats)
+
+
+# ======================================================
+# GENERATE FROM STREAMED PRICE LIST (text/plain / upload)
+# ======================================================
+async def iter_upload_chunks(upload):
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+@app.post("/generate/stream")
+async def generate_stream(
+    request: Request,
+    date: str,
+    model: str = "",
+    color: str = "",
+    interior: str = "",
+    all_codes: str = "",
+    format: str = "excel"
+):
+    """
+    Wie /generate, aber die priced_lines kommen als roher Body
+    (text/plain) oder als Datei-Upload (multipart, Feld "file")
+    und werden zeilenweise geparst, ohne die Liste aufzubauen.
+    Die Codes kommen leerzeichengetrennt als Query-Parameter.
+    """
+    fmt = check_format(format)
+    request.state.format = fmt
+
+    content_type = request.headers.get("content-type", "")
+    parse_stats = ParseStats()
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing upload field 'file'")
+        with stage("parse"):
+            priced_prices = await aparse_priced_lines(iter_upload_chunks(upload), parse_stats)
+    else:
+        with stage("parse"):
+            priced_prices = await aparse_priced_lines(request.stream(), parse_stats)
+    record_parse_stats(parse_stats)
+    codes = all_codes.split()
+    priced_prices = await run_in_threadpool(resolve_prices, date, codes, priced_prices)
+
+    async with render_slot():
+        with stage("catalog"):
+            snapshot = catalog.get()
+        with stage("normalize"):
+            parsed = normalize_vehicle_input(
+                model=model,
+                color=color,
+                interior=interior,
+                all_codes=codes,
+                options_meta=snapshot.options,
+                option_index=snapshot.index,
+                priced_prices=priced_prices
+            )
+
+        content = await arender_quotation(parsed, fmt)
+    return file_response(content, fmt, parse_stats=parse_stats)
+
+
+# ======================================================
+# GENERATE FROM PRICE LIST FILE (CSV / XLSX)
+# ======================================================
+async def import_upload(file: UploadFile, all_codes: str) -> ImportedPriceList:
+    # Upload liegt bereits gespoolt vor; CSV-/XLSX-Lesen ist blockierend
+    with stage("parse"):
+        try:
+            imported = await run_in_threadpool(
+                import_price_file,
+                file.file,
+                file.filename or "",
+                file.content_type or "",
+                all_codes.split()
+            )
+        except (zipfile.BadZipFile, InvalidFileException, KeyError):
+            # kaputte / keine echte .xlsx (KeyError: fehlender Teil im Archiv)
+            raise HTTPException(status_code=400, detail="Unreadable price list")
+    record_parse_stats(imported.stats)
+    return imported
+
+
+def normalize_import(imported: ImportedPriceList, date: str, model: str, color: str, interior: str) -> Quotation:
+    priced_prices = resolve_prices(date, imported.codes, imported.prices)
+    with stage("catalog"):
+        snapshot = catalog.get()
+    with stage("normalize"):
+        return normalize_vehicle_input(
+            model=model,
+            color=color,
+            interior=interior,
+            all_codes=imported.codes,
+            options_meta=snapshot.options,
+            option_index=snapshot.index,
+            priced_prices=priced_prices
+        )
+
+
+@app.post("/generate/import")
+async def generate_import(
+    request: Request,
+    date: str,
+    file: UploadFile = File(...),
+    model: str = "",
+    color: str = "",
+    interior: str = "",
+    all_codes: str = "",
+    format: str = "excel"
+):
+    """
+    Händler-Preisliste als CSV oder XLSX (multipart, Feld "file"):
+    Code in der ersten Spalte, Preis in der letzten (oder per Kopfzeile
+    "Code" / "Preis"). Alle Codes der Datei landen in all_codes;
+    zusätzliche Codes (Modell, Farbe, ...) optional als Query-Parameter.
+    """
+    fmt = check_format(format)
+    request.state.format = fmt
+
+    imported = await import_upload(file, all_codes)
+    async with render_slot():
+        parsed = await run_in_threadpool(normalize_import, imported, date, model, color, interior)
+        content = await arender_quotation(parsed, fmt)
+    return file_response(content, fmt, parse_stats=imported.stats)
+
+
+@app.post("/import/parse")
+async def import_parse(
+    response: Response,
+    file: UploadFile = File(...),
+    date: str = "",
+    model: str = "",
+    color: str = "",
+    interior: str = "",
+    all_codes: str = ""
+):
+    """Normalisierte Struktur aus einer Preisliste, ohne zu rendern."""
+    imported = await import_upload(file, all_codes)
+    parsed = await run_in_threadpool(normalize_import, imported, date, model, color, interior)
+
+    response.headers["X-Rejected-Lines"] = str(imported.stats.rejected)
+    return {
+        **parsed.to_dict(),
+        "all_codes": imported.codes,
+        "import": imported.stats.to_dict(),
+    }
+
+
+# ======================================================
+# PRICE SIMULATION (MATRIX)
+# ======================================================
+# Bleibt "def": NumPy / SQLite laufen im Threadpool, nicht auf dem Event-Loop
+@app.post("/pricing/matrix")
+def pricing_matrix(req: PriceMatrixRequest):
+    store = active_price_store()
+    try:
+        price_table = store.price_table() if store is not None else catalog.get().prices
+    except PriceStoreError as exc:
+        raise price_store_unavailable(exc)
+
+    try:
+        result = {"dates": req.dates}
+
+        if req.codes:
+            result["codes"] = req.codes
+            result["prices"] = price_table.price_matrix(req.codes, req.dates).tolist()
+
+        if req.configurations:
+            result["totals"] = price_table.configuration_totals(
+                req.configurations, req.dates
+            ).tolist()
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    return result
+
+
+# ======================================================
+# BATCH GENERATE (ZIP)
+# ======================================================
+def iter_batch_files(
+    items: List[Tuple[str, str, Quotation]],
+    loop: asyncio.AbstractEventLoop
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Rendert die Angebote über den Render-Executor und liefert sie in
+    Eingabereihenfolge. Es sind höchstens 2 Jobs pro Worker
+    gleichzeitig unterwegs, damit fertige Dateien nicht im
+    Speicher auflaufen. Jeder Render belegt einen Admission-Slot.
+    """
+    window = render_executor.workers * 2
+    pending = deque()
+    todo = iter(items)
+
+    def submit(fmt: str, parsed: Quotation):
+        admission.acquire_from_thread(loop)
+        try:
+            future = render_executor.submit(fmt, parsed)
+        except BaseException:
+            admission.release_from_thread(loop)
+            raise
+        future.add_done_callback(lambda _: admission.release_from_thread(loop))
+        return future
+
+    for name, fmt, parsed in todo:
+        pending.append((name, submit(fmt, parsed)))
+        if len(pending) >= window:
+            break
+
+    while pending:
+        name, future = pending.popleft()
+        content = future.result()
+
+        upcoming = next(todo, None)
+        if upcoming is not None:
+            next_name, next_fmt, next_parsed = upcoming
+            pending.append((next_name, submit(next_fmt, next_parsed)))
+
+        yield name, content
+
+
+def prepare_batch_items(
+    requests: List[GenerateRequest],
+    formats: List[str]
+) -> List[Tuple[str, str, Quotation]]:
+    items = []
+    for index, (req, fmt) in enumerate(zip(requests, formats), start=1):
+        with stage("normalize"):
+            parsed = parse_request(req)
+
+        # bundle -> beide Dateien direkt ins Batch-ZIP
+        for item_fmt in (BUNDLE_FORMATS if fmt == "bundle" else [fmt]):
+            extension = os.path.splitext(OUTPUT_FORMATS[item_fmt][0])[1]
+            items.append((f"BMW_Quotation_{index:03d}{extension}", item_fmt, parsed))
+    return items
+
+
+@app.post("/generate/batch")
+async def generate_batch(batch: BatchGenerateRequest, request: Request):
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="Empty batch")
+
+    if len(batch.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {BATCH_MAX_ITEMS} requests)"
+        )
+
+    formats = []
+    for index, req in enumerate(batch.requests, start=1):
+        try:
+            formats.append(check_format(req.format))
+        except HTTPException as exc:
+            raise HTTPException(status_code=400, detail=f"Request {index}: {exc.detail}")
+    request.state.format = formats[0] if len(set(formats)) == 1 else "mixed"
+
+    # Bis zu BATCH_MAX_ITEMS Parses + Preisabfragen -> nicht auf dem Event-Loop
+    items = await run_in_threadpool(prepare_batch_items, batch.requests, formats)
+
+    try:
+        admission.check()
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=exc.status_code,
+            detail=exc.detail,
+            headers={"Retry-After": str(exc.retry_after)}
+        )
+
+    return StreamingResponse(
+        iter_zip(iter_batch_files(items, asyncio.get_running_loop())),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="BMW_Quotations.zip"'}
     )
 
-    if req.format.lower() == "excel":
-        file_path = build_excel(parsed)
 
-        return FileResponse(
-            file_path,
-            filename="BMW_Quotation.xlsx",
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# ======================================================
+# ASYNC JOBS (POLLING / WEBHOOK)
+# ======================================================
+job_queue = JobQueue(
+    JOB_WORKERS,
+    JOB_MAX_PENDING,
+    JOB_RESULT_TTL,
+    max_result_bytes=JOB_RESULT_MAX_BYTES,
+    allowed_hosts=WEBHOOK_ALLOWED_HOSTS
+)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(req: JobRequest, request: Request):
+    fmt = check_format(req.format)
+    request.state.format = fmt
+
+    if req.callback_url:
+        try:
+            check_callback_url(req.callback_url, WEBHOOK_ALLOWED_HOSTS)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    # Wie /generate: Preise auflösen, Cache-Key bilden; ein Treffer ist
+    # sofort ein fertiger Job (Frontend exportiert über /jobs)
+    with stage("catalog"):
+        snapshot = catalog.get()
+    parse_stats = ParseStats()
+    with stage("parse"):
+        priced_prices = await run_in_threadpool(parse_priced_lines, req.priced_lines, parse_stats)
+    record_parse_stats(parse_stats)
+    priced_prices = await run_in_threadpool(resolve_prices, req.date, req.all_codes, priced_prices)
+    cache_key = quotation_cache_key(req, priced_prices, snapshot.version)
+
+    filename, media_type = OUTPUT_FORMATS[fmt]
+    # Relative Pfade: hinter dem Proxy (ohne --forwarded-allow-ips) wäre
+    # das Schema sonst http:// und die https-Seite blockiert den Abruf
+    result_url_for = lambda job_id: str(app.url_path_for("get_job_result", job_id=job_id))
+
+    content = quotation_cache.get(cache_key)
+    try:
+        if content is not None:
+            job = job_queue.add_result(
+                content,
+                filename=filename,
+                media_type=media_type,
+                callback_url=req.callback_url,
+                result_url_for=result_url_for
+            )
+        else:
+            # Parsen sofort (Fehler landen direkt beim Client), Rendern im Job
+            with stage("normalize"):
+                parsed = await run_in_threadpool(parse_request, req, snapshot, priced_prices)
+            loop = asyncio.get_running_loop()
+
+            def render_job() -> bytes:
+                # Job-Renders zählen gegen dieselben Slots wie /generate
+                admission.acquire_from_thread(loop)
+                try:
+                    rendered = render_quotation(parsed, fmt)
+                finally:
+                    admission.release_from_thread(loop)
+                quotation_cache.put(cache_key, rendered)
+                return rendered
+
+            job = job_queue.submit(
+                render_job,
+                filename=filename,
+                media_type=media_type,
+                callback_url=req.callback_url,
+                result_url_for=result_url_for
+            )
+    except QueueFullError:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many queued jobs, retry later",
+            headers={"Retry-After": "5"}
         )
 
-    # if req.format.lower() == "pdf":
-    #     file_path = build_pdf(parsed)
-    #     return FileResponse(
-    #         file_path,
-    #         filename="BMW_Quotation.pdf",
-    #         media_type="application/pdf"
-    #     )
-
-    raise HTTPException(
-        status_code=400,
-        detail="Unknown format (use 'excel')"
+    return {
+        "id": job.id,
+        "status": job.status,
+        "status_url": str(app.url_path_for("get_job", job_id=job.id)),
+        "result_url": job.result_url,
+        "cache": "HIT" if content is not None else "MISS",
+        "rejected_lines": parse_stats.rejected,
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+
+    if job.status != "done":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is {job.status}",
+            headers={"Retry-After": "1"}
+        )
+
+    return Response(
+        content=job.content,
+        media_type=job.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{job.filename}"'}
     )
+
+
+@app.get("/debug/jobs")
+async def debug_jobs():
+    return job_queue.stats()
+
+
+# ======================================================
+# METRICS (PROMETHEUS)
+# ======================================================
+def collect_component_metrics():
+    """Zähler, die Katalog, Cache, Render-Pool und Jobs ohnehin führen."""
+    catalog_stats = catalog.stats()
+    cache_stats = quotation_cache.stats()
+    render_stats = render_executor.stats()
+    job_stats = job_queue.stats()
+    admission_stats = admission.stats()
+
+    collected = [
+        ("bmw_catalog_reloads_total", "counter", "Catalog reloads after file changes", catalog_stats["reload_count"]),
+        ("bmw_catalog_reload_errors_total", "counter", "Failed catalog reloads", catalog_stats["reload_errors"]),
+        ("bmw_catalog_last_load_seconds", "gauge", "Duration of the last catalog load", catalog_stats["last_load_seconds"]),
+        ("bmw_catalog_codes", "gauge", "Option codes in the current catalog", catalog_stats["codes"]),
+        ("bmw_cache_hits_total", "counter", "Quotation cache hits", cache_stats["hits"]),
+        ("bmw_cache_misses_total", "counter", "Quotation cache misses", cache_stats["misses"]),
+        ("bmw_cache_evictions_total", "counter", "Quotation cache evictions", cache_stats["evictions"]),
+        ("bmw_cache_hit_ratio", "gauge", "Quotation cache hit ratio", cache_stats["hit_ratio"]),
+        ("bmw_cache_size_bytes", "gauge", "Bytes held by the quotation cache", cache_stats["size_bytes"]),
+        ("bmw_render_tasks_total", "counter", "Documents submitted to the render pool", render_stats["tasks"]),
+        ("bmw_render_pool_recycles_total", "counter", "Render pool recycles", render_stats["recycles"]),
+        ("bmw_render_pool_broken_total", "counter", "Render pools replaced after a worker died", render_stats["broken_pools"]),
+        ("bmw_admission_in_flight", "gauge", "Renders admitted and running", admission_stats["in_flight"]),
+        ("bmw_admission_queue_depth", "gauge", "Requests waiting for a render slot", admission_stats["queue_depth"]),
+        ("bmw_admission_queued_total", "counter", "Requests that had to wait for a render slot", admission_stats["queued"]),
+        ("bmw_admission_rejected_full_total", "counter", "Requests rejected with 429 (wait queue full)", admission_stats["rejected_full"]),
+        ("bmw_admission_rejected_timeout_total", "counter", "Requests rejected with 503 (waited too long)", admission_stats["rejected_timeout"]),
+        ("bmw_jobs_queued", "gauge", "Jobs waiting for a worker", job_stats["queued"]),
+        ("bmw_jobs_running", "gauge", "Jobs currently rendering", job_stats["running"]),
+        ("bmw_jobs_rejected_total", "counter", "Jobs rejected because the queue was full", job_stats["rejected"]),
+        ("bmw_jobs_failed_total", "counter", "Failed jobs", job_stats["failed"]),
+    ]
+
+    if price_store is not None:
+        collected.append(("bmw_price_store_queries_total", "counter", "Price store lookups", price_store.queries))
+        collected.append((
+            "bmw_price_store_query_seconds_total", "counter",
+            "Time spent in price store lookups", price_store.query_seconds
+        ))
+
+    return collected
+
+
+registry.add_collector(collect_component_metrics)
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
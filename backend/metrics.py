@@ -0,0 +1,294 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# ======================================================
+# MINIMALE PROMETHEUS-METRIKEN (TEXTFORMAT 0.0.4)
+# ======================================================
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # key -> [Zähler je Bucket..., +Inf], Summe, Anzahl
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = ([0] * (len(self.buckets) + 1), [0.0, 0])
+                self._values[key] = entry
+            counts, totals = entry
+            counts[index] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), list(totals)) for key, (counts, totals) in self._values.items()]
+
+        lines = self.header()
+        for key, counts, (total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Sammelt Metriken und Collector-Funktionen.
+    Collector liefern (name, typ, hilfe, wert) für Werte, die andere
+    Komponenten ohnehin zählen (Cache, Katalog, Jobs, ...).
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, float]]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, float]]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        for collector in self._collectors:
+            for name, kind, help, value in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# ======================================================
+# APP-METRIKEN
+# ======================================================
+registry = Registry()
+
+REQUESTS = registry.counter(
+    "bmw_http_requests_total",
+    "HTTP requests by route, method, output format and status",
+    ("path", "method", "format", "status"),
+)
+REQUEST_DURATION = registry.histogram(
+    "bmw_http_request_duration_seconds",
+    "Time from request start until the last response byte was sent",
+    ("path",),
+)
+STAGE_DURATION = registry.histogram(
+    "bmw_stage_duration_seconds",
+    "Time spent per processing stage (catalog, parse, prices, queue, normalize, build, save, send)",
+    ("stage",),
+)
+IN_FLIGHT = registry.gauge(
+    "bmw_http_requests_in_flight",
+    "Requests currently being processed",
+)
+REQUEST_BYTES = registry.histogram(
+    "bmw_http_request_size_bytes",
+    "Request body size",
+    ("path",),
+    SIZE_BUCKETS,
+)
+RESPONSE_BYTES = registry.histogram(
+    "bmw_http_response_size_bytes",
+    "Response body size",
+    ("path",),
+    SIZE_BUCKETS,
+)
+
+PRICED_LINES = registry.counter(
+    "bmw_priced_lines_total",
+    "Priced input lines by tokenizer result (parsed, rejected, blank)",
+    ("result",),
+)
+
+
+def stage(name: str):
+    """with stage("parse"): ...  -> bmw_stage_duration_seconds{stage="parse"}"""
+    return STAGE_DURATION.time(stage=name)
+
+
+def record_stages(timings: Dict[str, float]):
+    for name, seconds in timings.items():
+        STAGE_DURATION.observe(seconds, stage=name)
+
+
+def record_parse_stats(stats):
+    """vehicle_parser.ParseStats -> bmw_priced_lines_total"""
+    PRICED_LINES.inc(stats.parsed, result="parsed")
+    PRICED_LINES.inc(stats.rejected, result="rejected")
+    PRICED_LINES.inc(stats.blank, result="blank")
+
+
+# ======================================================
+# ASGI MIDDLEWARE
+# ======================================================
+class MetricsMiddleware:
+    """
+    Misst jede HTTP-Anfrage: Dauer bis zum letzten gesendeten Byte,
+    Sendezeit der Antwort (Stage "send"), Body-Größen, Status und
+    das Ausgabeformat (Handler setzen request.state.format).
+    """
+
+    def __init__(self, app, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_bytes = 0
+        response_bytes = 0
+        status = 500
+        send_started = None
+
+        async def counting_receive():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def timing_send(message):
+            nonlocal response_bytes, status, send_started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                send_started = time.perf_counter()
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, counting_receive, timing_send)
+        finally:
+            IN_FLIGHT.dec()
+            finished = time.perf_counter()
+
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            fmt = (scope.get("state") or {}).get("format", "none")
+
+            REQUESTS.inc(path=path, method=scope["method"], format=fmt, status=status)
+            REQUEST_DURATION.observe(finished - started, path=path)
+            REQUEST_BYTES.observe(request_bytes, path=path)
+            RESPONSE_BYTES.observe(response_bytes, path=path)
+
+            if send_started is not None:
+                STAGE_DURATION.observe(finished - send_started, stage="send")
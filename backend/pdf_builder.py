@@ -1,78 +1,174 @@
-import os
 from datetime import datetime
+from io import BytesIO
+from typing import Optional, Union
+
 from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
 
+from quotation import Quotation, as_quotation
+
+
+# Abschnitte in der Reihenfolge des Angebots
+SECTIONS = [
+    ("base", "Basisfahrzeug"),
+    ("standard", "Serienausstattung"),
+    ("security", "Sicherheitsausstattung"),
+    ("optional", "Sonderausstattung"),
+]
+
+LEFT = 30 * mm
+CODE_X = 32 * mm
+TEXT_X = 50 * mm
+BOTTOM = 25 * mm
+LINE_GAP = 6 * mm
+PRICE_GAP = 4 * mm  # Mindestabstand Text -> Preis
+ELLIPSIS = "…"
+
+
+def format_price(price: float) -> str:
+    return f"{price:.2f} €"
+
+
+def fit_text(text: str, max_width: float, font: str, size: float) -> str:
+    """Kürzt den Text mit '…', bis er in max_width passt."""
+    if stringWidth(text, font, size) <= max_width:
+        return text
+
+    # Binärsuche über die Länge statt Zeichen für Zeichen
+    available = max_width - stringWidth(ELLIPSIS, font, size)
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if stringWidth(text[:mid], font, size) <= available:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + ELLIPSIS
+
+
+class _PdfWriter:
+    """
+    Dünne Hülle um den Canvas: merkt sich die aktuelle Schrift
+    (setFont nur bei Wechsel) und bricht automatisch auf eine neue
+    Seite um, wenn der Platz nicht mehr reicht.
+    """
+
+    def __init__(self, c: canvas.Canvas):
+        self.c = c
+        self.width, self.height = A4
+        self.right = self.width - 30 * mm
+        self.page = 1
+        self.y = 0.0
+        self._font: Optional[tuple] = None
+
+    def font(self, name: str, size: float):
+        if self._font != (name, size):
+            self.c.setFont(name, size)
+            self._font = (name, size)
+
+    def first_page_header(self):
+        c = self.c
+
+        self.font("Helvetica-Bold", 18)
+        c.drawString(LEFT, self.height - 25 * mm, "BMW ANGEBOT")
+
+        c.setLineWidth(1)
+        c.line(LEFT, self.height - 28 * mm, self.right, self.height - 28 * mm)
+
+        self.font("Helvetica", 10)
+        c.drawString(LEFT, self.height - 38 * mm, f"Datum: {datetime.now().strftime('%d.%m.%Y')}")
+
+        self.y = self.height - 50 * mm
+
+    def new_page(self):
+        c = self.c
+        c.showPage()
+        # showPage setzt den Grafikzustand zurück -> Schrift neu setzen
+        self._font = None
+        self.page += 1
+
+        self.font("Helvetica", 8)
+        c.drawString(LEFT, self.height - 15 * mm, "BMW ANGEBOT (Fortsetzung)")
+        c.drawRightString(self.right, self.height - 15 * mm, f"Seite {self.page}")
+
+        self.y = self.height - 25 * mm
+
+    def ensure_space(self, needed: float):
+        if self.y - needed < BOTTOM:
+            self.new_page()
+
+    def heading(self, text: str):
+        # Überschrift nicht allein am Seitenende
+        self.ensure_space(2 * LINE_GAP)
+        self.y -= 4
+        self.font("Helvetica-Bold", 11)
+        self.c.drawString(LEFT, self.y, text)
+        self.y -= LINE_GAP
+
+    def item(self, code: str, text: str, price: float):
+        self.ensure_space(LINE_GAP)
+        self.font("Helvetica", 10)
+        price_text = format_price(price)
+        # Langer Text würde sonst in die Preisspalte laufen
+        max_width = self.right - TEXT_X - stringWidth(price_text, "Helvetica", 10) - PRICE_GAP
+
+        self.c.drawString(CODE_X, self.y, code)
+        self.c.drawString(TEXT_X, self.y, fit_text(text, max_width, "Helvetica", 10))
+        self.c.drawRightString(self.right, self.y, price_text)
+        self.y -= LINE_GAP
+
+    def subtotal(self, label: str, amount: float):
+        self.ensure_space(LINE_GAP)
+        self.font("Helvetica-Oblique", 9)
+        self.c.drawString(TEXT_X, self.y, label)
+        self.c.drawRightString(self.right, self.y, format_price(amount))
+        self.y -= LINE_GAP
+
+    def total(self, amount: float):
+        self.ensure_space(3 * LINE_GAP)
+        self.y -= 10
+        self.c.setLineWidth(0.5)
+        self.c.line(LEFT, self.y, self.right, self.y)
+        self.y -= LINE_GAP
+
+        self.font("Helvetica-Bold", 12)
+        self.c.drawString(LEFT, self.y, "Gesamtpreis")
+        self.c.drawRightString(self.right, self.y, format_price(amount))
+
+
+def build_pdf(vehicle_data: Union[Quotation, dict]) -> bytes:
+    """
+    Rendert das Angebot aus der normalisierten Struktur
+    (base / standard / security / optional, total_price)
+    direkt in den Speicher. Lange Optionslisten laufen auf
+    Folgeseiten weiter.
+    """
+    quotation = as_quotation(vehicle_data)
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    writer = _PdfWriter(c)
+
+    writer.first_page_header()
+
+    for category, title in SECTIONS:
+        lines = quotation.lines(category)
+        if not lines:
+            continue
+
+        writer.heading(title)
+
+        for line in lines:
+            writer.item(line.code, line.text, line.price)
 
-def build_pdf(model, color, interior, options):
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(base_dir, "output")
-    os.makedirs(output_dir, exist_ok=True)
-
-    filename = f"angebot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    filepath = os.path.join(output_dir, filename)
-
-    c = canvas.Canvas(filepath, pagesize=A4)
-    width, height = A4
-
-    # === FONTS ===
-    c.setFont("Helvetica", 10)
-
-    # === HEADER ===
-    c.setFont("Helvetica-Bold", 18)
-    c.drawString(30 * mm, height - 25 * mm, "BMW ANGEBOT")
-
-    c.setLineWidth(1)
-    c.line(30 * mm, height - 28 * mm, width - 30 * mm, height - 28 * mm)
-
-    # === META INFO ===
-    c.setFont("Helvetica", 10)
-    c.drawString(30 * mm, height - 38 * mm, f"Datum: {datetime.now().strftime('%d.%m.%Y')}")
-
-    # === BASISDATEN ===
-    y = height - 55 * mm
-    line_gap = 8 * mm
-
-    def draw_row(label, value, price):
-        nonlocal y
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(30 * mm, y, label)
-        c.setFont("Helvetica", 10)
-        c.drawString(70 * mm, y, value)
-        c.drawRightString(width - 30 * mm, y, f"{price} €")
-        y -= line_gap
-
-    draw_row("Modell", model["description"], model["price"])
-    draw_row("Farbe", color["description"], color["price"])
-    draw_row("Interieur", interior["description"], interior["price"])
-
-    # === OPTIONEN ===
-    y -= 10
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(30 * mm, y, "Optionen")
-    y -= line_gap
-
-    total = model["price"] + color["price"] + interior["price"]
-
-    c.setFont("Helvetica", 10)
-    for opt in options:
-        c.drawString(32 * mm, y, f"{opt['code']} – {opt['description']}")
-        c.drawRightString(width - 30 * mm, y, f"{opt['price']} €")
-        total += opt["price"]
-        y -= line_gap
-
-    # === TOTAL ===
-    y -= 10
-    c.setLineWidth(0.5)
-    c.line(30 * mm, y, width - 30 * mm, y)
-    y -= line_gap
+        if category != "base":
+            writer.subtotal(f"Summe {title}", quotation.subtotal(category))
 
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(30 * mm, y, "Gesamtpreis")
-    c.drawRightString(width - 30 * mm, y, f"{total} €")
+    writer.total(quotation.total_price)
 
     c.showPage()
     c.save()
 
-    return filepath
+    return buffer.getvalue()
@@ -0,0 +1,216 @@
+import csv
+import io
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from vehicle_parser import CODE_CHARS, CURRENCY_WORDS, FIELD_STRIP, ParseStats, join_split_amount, parse_price
+
+# ======================================================
+# PREISLISTEN-IMPORT (CSV / XLSX)
+# ======================================================
+# Händler-Preisliste als Datei statt eingefügter Textzeilen:
+#
+#   Code;Text;Preis          <- Kopfzeile optional
+#   1AB;Basis 320d;          <- Code ohne Preis (Modell, Farbe, Polster)
+#   3AB;Sitzheizung;1.234,56
+#
+# Jede Zeile liefert einen Code (landet in all_codes) und ggf. einen
+# Preis. Die Datei wird zeilenweise gelesen; aufgebaut werden nur die
+# Code-Liste und das Preis-Dict für den Normalizer.
+XLSX_EXTENSIONS = (".xlsx", ".xlsm")
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_DELIMITERS = ";\t,"
+MAX_CODE_LENGTH = 8  # Katalog hat auch 4-stellige Codes ('66GR')
+
+CODE_HEADERS = frozenset(("code", "codes", "sa", "sa-code", "option", "optionscode", "options-code"))
+PRICE_HEADERS = frozenset(("preis", "price", "betrag", "brutto", "netto", "uvp"))
+
+
+class ImportedPriceList:
+    """all_codes in Dateireihenfolge (ohne Dubletten) plus Preise je Code."""
+
+    __slots__ = ("codes", "prices", "stats")
+
+    def __init__(self):
+        self.codes: List[str] = []
+        self.prices: Dict[str, float] = {}
+        self.stats = ParseStats()
+
+    def to_dict(self) -> Dict:
+        return {
+            "codes": self.codes,
+            "prices": self.prices,
+            **self.stats.to_dict(),
+        }
+
+
+def is_xlsx(filename: str = "", content_type: str = "") -> bool:
+    return (filename or "").lower().endswith(XLSX_EXTENSIONS) or content_type == XLSX_CONTENT_TYPE
+
+
+# ======================================================
+# ROW SOURCES
+# ======================================================
+def iter_csv_rows(lines: Iterable[str]) -> Iterator[Sequence]:
+    """
+    csv.reader über beliebige Zeilen-Iterables (auch Dateiobjekte).
+    Trenner wird an der ersten Zeile mit Inhalt erkannt (';' / TAB / ',').
+    Bei ',' werden unquotierte Beträge wieder zusammengesetzt
+    ('3AB,Sitz,1.234,56' -> [..., '1.234,56']).
+    """
+    lines = iter(lines)
+    first = ""
+    for first in lines:
+        if first.strip():
+            break
+
+    counts = [first.count(delimiter) for delimiter in CSV_DELIMITERS]
+    delimiter = CSV_DELIMITERS[counts.index(max(counts))]
+
+    def all_lines():
+        yield first
+        yield from lines
+
+    reader = csv.reader(all_lines(), delimiter=delimiter)
+    if delimiter == ",":
+        return (join_split_amount(row) for row in reader)
+    return reader
+
+
+def iter_csv_file(file: IO[bytes], encoding: str = "utf-8-sig") -> Iterator[Sequence]:
+    return iter_csv_rows(io.TextIOWrapper(file, encoding=encoding, errors="replace", newline=""))
+
+
+def iter_xlsx_rows(file: IO[bytes], sheet: Optional[str] = None) -> Iterator[Sequence]:
+    """
+    openpyxl im read_only-Modus: Zeilen werden beim Iterieren aus dem
+    XML gelesen, das Workbook wird nie komplett aufgebaut.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.active
+        yield from ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+# ======================================================
+# ROWS -> CODES + PREISE
+# ======================================================
+def _is_code(code: str) -> bool:
+    return 0 < len(code) <= MAX_CODE_LENGTH and not code.strip(CODE_CHARS)
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    return str(value).strip(FIELD_STRIP)
+
+
+def _cell_price(value) -> Optional[float]:
+    # XLSX liefert Zahlen bereits typisiert
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return parse_price(_cell_text(value))
+
+
+def _header_columns(row: Sequence):
+    """
+    Spaltenpositionen aus einer Kopfzeile, sonst None. Steht in der
+    Code-Spalte ein gültiger Code, ist es eine Datenzeile (außer der
+    Zelle heißt selbst wie eine Code-Überschrift, z.B. 'SA').
+    """
+    names = [_cell_text(value).lower() for value in row]
+    code_col = next((i for i, name in enumerate(names) if name in CODE_HEADERS), None)
+    price_col = next((i for i, name in enumerate(names) if name in PRICE_HEADERS), None)
+    if code_col is None and price_col is None:
+        return None
+
+    code_col = code_col or 0
+    if code_col < len(row) and _is_code(_cell_text(row[code_col])) and names[code_col] not in CODE_HEADERS:
+        return None
+    return code_col, price_col
+
+
+def import_price_rows(rows: Iterable[Sequence], extra_codes: Iterable[str] = ()) -> ImportedPriceList:
+    """
+    Ohne Kopfzeile: Code in der ersten Spalte, Preis in der letzten
+    Spalte mit Inhalt. Zeilen mit nur Code (+ Text) sind Codes ohne
+    Preis; Zeilen ohne gültigen Code oder mit unlesbarem Preis werden
+    in stats als abgelehnt gezählt.
+    """
+    result = ImportedPriceList()
+    stats = result.stats
+    codes = result.codes
+    prices = result.prices
+    seen = set()
+
+    for code in extra_codes:
+        if code and code not in seen:
+            seen.add(code)
+            codes.append(code)
+
+    code_col, price_col = 0, None
+    header_checked = False
+
+    for row in rows:
+        if not row or not any(_cell_text(value) for value in row):
+            stats.blank += 1
+            continue
+
+        if not header_checked:
+            header_checked = True
+            columns = _header_columns(row)
+            if columns is not None:
+                code_col, price_col = columns
+                continue
+
+        code = _cell_text(row[code_col]) if code_col < len(row) else ""
+        if not _is_code(code):
+            stats.reject(";".join(_cell_text(value) for value in row))
+            continue
+
+        # Reine Währungsspalten ('EUR', '€') zählen nicht als Preis
+        currency = any(_cell_text(value) in CURRENCY_WORDS for value in row)
+
+        if price_col is not None:
+            cell = row[price_col] if price_col < len(row) else None
+            rest = [cell] if _cell_text(cell) else []
+        else:
+            rest = [
+                value for i, value in enumerate(row)
+                if i != code_col and _cell_text(value) and _cell_text(value) not in CURRENCY_WORDS
+            ]
+
+        price = None
+        if rest:
+            price = _cell_price(rest[-1])
+        # 'CODE;Text' ist ein Code ohne Preis, 'CODE;Text;kaputt' und
+        # 'CODE;Text;€' nicht
+        if price is None and (currency or (rest and (price_col is not None or len(rest) > 1))):
+            stats.reject(";".join(_cell_text(value) for value in row))
+            continue
+
+        stats.parsed += 1
+        if code not in seen:
+            seen.add(code)
+            codes.append(code)
+        if price is not None:
+            prices[code] = price
+
+    return result
+
+
+def import_price_file(
+    file: IO[bytes],
+    filename: str = "",
+    content_type: str = "",
+    extra_codes: Iterable[str] = ()
+) -> ImportedPriceList:
+    """CSV oder XLSX (nach Dateiendung / Content-Type)."""
+    if is_xlsx(filename, content_type):
+        rows = iter_xlsx_rows(file)
+    else:
+        rows = iter_csv_file(file)
+    return import_price_rows(rows, extra_codes)
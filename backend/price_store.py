@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pricing import PriceTable, date_ordinal
+
+# ======================================================
+# VERSIONIERTE PREISLISTEN (SQLITE)
+# ======================================================
+# Jede importierte Preisliste (z.B. quartalsweise) bekommt eine Zeile in
+# price_lists; ihre Regeln (code, gültig ab, Preis) landen in price_rules.
+# Gleicher Code + gleiches Datum aus einer späteren Liste ersetzt die
+# ältere Regel - wie in PriceTable gewinnt die spätere Regel.
+#
+# Datumswerte als ISO-Text ('2026-04-01'): sortiert korrekt und der
+# Index (code, effective_from) beantwortet "letzte Regel <= Datum"
+# mit einer Suche pro Code.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_lists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    imported_at REAL NOT NULL,
+    rules INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS price_rules (
+    code TEXT NOT NULL,
+    effective_from TEXT NOT NULL,
+    price REAL NOT NULL,
+    list_id INTEGER NOT NULL REFERENCES price_lists(id),
+    PRIMARY KEY (code, effective_from)
+) WITHOUT ROWID;
+"""
+
+# Ein Statement für die ganze Konfiguration: Codes als JSON-Array,
+# pro Code eine Index-Suche (kein Scan, keine Parameter-Obergrenze)
+PRICES_FOR_CODES = """
+SELECT wanted.value, (
+    SELECT price FROM price_rules
+    WHERE code = wanted.value AND effective_from <= ?
+    ORDER BY effective_from DESC
+    LIMIT 1
+)
+FROM json_each(?) AS wanted
+"""
+
+REQUIRED_TABLES = frozenset(("price_lists", "price_rules"))
+
+
+class PriceStoreError(Exception):
+    """Datei vorhanden, aber kein lesbarer Preislisten-Store (kaputt / anderes Schema)."""
+
+
+def iso_date(date_str: str) -> str:
+    """'2026-4-1' -> '2026-04-01' (ValueError bei ungültigem Datum)."""
+    return date.fromordinal(date_ordinal(date_str)).isoformat()
+
+
+class PriceStore:
+    """
+    Preisregeln in einer SQLite-Datei. Lesezugriffe laufen über eine
+    Verbindung pro Thread (read-only); schreiben nur Import / CLI.
+
+    Die Datei darf auch erst nach dem Start angelegt werden (exists()).
+    Lesefehler kommen als PriceStoreError, nicht als sqlite3-Fehler.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._table_lock = threading.Lock()
+        self._table: Optional[Tuple[int, PriceTable]] = None
+
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    # --------------------------------------------------
+    # VERBINDUNGEN
+    # --------------------------------------------------
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+                tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            except sqlite3.Error as exc:
+                raise PriceStoreError(f"{self.path}: {exc}") from exc
+
+            missing = REQUIRED_TABLES - tables
+            if missing:
+                conn.close()
+                raise PriceStoreError(f"{self.path}: not a price store (missing tables: {', '.join(sorted(missing))})")
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[Tuple]:
+        try:
+            return self._reader().execute(sql, params).fetchall()
+        except sqlite3.Error as exc:
+            raise PriceStoreError(f"{self.path}: {exc}") from exc
+
+    def _writer(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def create(self):
+        self._writer().close()
+
+    # --------------------------------------------------
+    # IMPORT
+    # --------------------------------------------------
+    def import_rules(self, name: str, rules: Iterable[Tuple[str, str, float]]) -> int:
+        """
+        Neue Preisliste aus (code, gültig ab, Preis). Läuft in einer
+        Transaktion; liefert die id der Liste.
+        """
+        conn = self._writer()
+        try:
+            with conn:
+                list_id = conn.execute(
+                    "INSERT INTO price_lists (name, imported_at) VALUES (?, ?)",
+                    (name, time.time())
+                ).lastrowid
+                count = conn.executemany(
+                    "INSERT OR REPLACE INTO price_rules (code, effective_from, price, list_id) "
+                    "VALUES (?, ?, ?, ?)",
+                    ((code, iso_date(effective_from), float(price), list_id)
+                     for code, effective_from, price in rules)
+                ).rowcount
+                conn.execute("UPDATE price_lists SET rules = ? WHERE id = ?", (count, list_id))
+        finally:
+            conn.close()
+        return list_id
+
+    def import_prices(self, name: str, effective_from: str, prices: Dict[str, float]) -> int:
+        """Komplette Preisliste, gültig ab einem Stichtag (Quartalsliste)."""
+        return self.import_rules(name, ((code, effective_from, price) for code, price in prices.items()))
+
+    def import_options(self, name: str, options_data: Dict) -> int:
+        """Bestehende "prices"-Regeln aus options_meta.json übernehmen."""
+        return self.import_rules(name, (
+            (code, rule["from"], rule["price"])
+            for code, option in options_data.items()
+            if isinstance(option, dict)
+            for rule in option.get("prices") or ()
+        ))
+
+    # --------------------------------------------------
+    # ABFRAGEN
+    # --------------------------------------------------
+    def version(self) -> int:
+        return self._query("SELECT COALESCE(MAX(id), 0) FROM price_lists")[0][0]
+
+    def prices_for(self, codes: Sequence[str], date_str: str) -> Dict[str, float]:
+        """
+        Gültige Preise aller `codes` zum Datum, eine Abfrage.
+        Codes ohne Regel (oder nur mit späteren Regeln) fehlen im Ergebnis.
+        """
+        if not codes:
+            return {}
+
+        started = time.perf_counter()
+        rows = self._query(PRICES_FOR_CODES, (iso_date(date_str), json.dumps(list(codes))))
+        prices = {code: price for code, price in rows if price is not None}
+
+        self.queries += 1
+        self.query_seconds += time.perf_counter() - started
+        return prices
+
+    def price_table(self) -> PriceTable:
+        """Alle Regeln als PriceTable (/pricing/matrix), neu gebaut pro Preislisten-Version."""
+        version = self.version()
+        cached = self._table
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with self._table_lock:
+            # Ein anderer Thread kann die Tabelle inzwischen gebaut haben
+            cached = self._table
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            options: Dict[str, Dict[str, List[Dict]]] = {}
+            rows = self._query(
+                "SELECT code, effective_from, price FROM price_rules ORDER BY code, effective_from"
+            )
+            for code, effective_from, price in rows:
+                options.setdefault(code, {"prices": []})["prices"].append(
+                    {"from": effective_from, "price": price}
+                )
+            table = PriceTable(options)
+            self._table = (version, table)
+        return table
+
+    def lists(self) -> List[Dict]:
+        rows = self._query("SELECT id, name, imported_at, rules FROM price_lists ORDER BY id DESC")
+        return [
+            {"id": list_id, "name": name, "imported_at": imported_at, "rules": rules}
+            for list_id, name, imported_at, rules in rows
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "version": self.version(),
+            "rules": self._query("SELECT COUNT(*) FROM price_rules")[0][0],
+            "codes": self._query("SELECT COUNT(DISTINCT code) FROM price_rules")[0][0],
+            "queries": self.queries,
+            "query_seconds": self.query_seconds,
+        }
+
+
+def open_price_store(path: str) -> Optional[PriceStore]:
+    """
+    None ohne Pfad. Ob die Datei existiert, wird erst bei der Abfrage
+    geprüft (exists()) - ein späterer CLI-Import braucht keinen Neustart.
+    """
+    if not path:
+        return None
+    return PriceStore(path)
+
+
+if __name__ == "__main__":
+    # Quartalsliste einspielen:
+    #   python price_store.py prices.sqlite import preisliste_q2.xlsx --from 2026-04-01
+    # Regeln aus options_meta.json übernehmen:
+    #   python price_store.py prices.sqlite import-options options_meta.json
+    from price_import import import_price_file
+
+    parser = argparse.ArgumentParser(description="Versionierte Preislisten (SQLite)")
+    parser.add_argument("store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_cmd = commands.add_parser("import", help="CSV / XLSX-Preisliste mit Stichtag")
+    import_cmd.add_argument("file")
+    import_cmd.add_argument("--from", dest="effective_from", required=True)
+    import_cmd.add_argument("--name")
+
+    options_cmd = commands.add_parser("import-options", help="'prices'-Regeln aus options_meta.json")
+    options_cmd.add_argument("file")
+    options_cmd.add_argument("--name")
+
+    commands.add_parser("lists", help="Importierte Preislisten anzeigen")
+
+    args = parser.parse_args()
+    store = PriceStore(args.store)
+    store.create()
+
+    if args.command == "import":
+        with open(args.file, "rb") as f:
+            imported = import_price_file(f, args.file)
+        list_id = store.import_prices(args.name or os.path.basename(args.file), args.effective_from, imported.prices)
+        print(f"list {list_id}: {len(imported.prices)} prices, {imported.stats.rejected} rejected rows")
+    elif args.command == "import-options":
+        with open(args.file, encoding="utf-8") as f:
+            list_id = store.import_options(args.name or os.path.basename(args.file), json.load(f))
+        print(f"list {list_id}")
+
+    for price_list in store.lists():
+        print(price_list)
@@ -1,29 +1,204 @@
-from datetime import datetime
-from typing import Dict, Any
+from bisect import bisect_right
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 
 def parse_date(date_str: str) -> datetime:
     return datetime.strptime(date_str, "%Y-%m-%d")
 
 
+@lru_cache(maxsize=4096)
+def date_ordinal(date_str: str) -> int:
+    """
+    Datum -> Tagesnummer (date.toordinal), gecacht.
+    Vergleiche laufen danach nur noch über ints.
+    """
+    try:
+        return date.fromisoformat(date_str).toordinal()
+    except ValueError:
+        # z.B. '2025-1-5' -> strptime ist toleranter
+        return parse_date(date_str).toordinal()
+
+
+# Spaltenschlüssel = code_id * KEY_STRIDE + Tagesnummer
+# (date.max.toordinal() = 3652059 < 2**22)
+KEY_STRIDE = 1 << 22
+
+
+# ======================================================
+# PRECOMPILED PRICE TABLE
+# ======================================================
+class PriceTable:
+    """
+    Preisregeln aller Optionen, einmal beim Laden des Katalogs kompiliert:
+    pro Code nach Gültigkeitsdatum sortierte Listen (Tagesnummern, Preise).
+    Lookup per Binärsuche, das zuletzt angefragte Datum wird gemerkt.
+    """
+
+    __slots__ = ("_rules", "_last_date", "_columns")
+
+    def __init__(self, options_data: Dict[str, Any]):
+        rules: Dict[str, Tuple[List[int], List[Any]]] = {}
+
+        for code, option in options_data.items():
+            entries = option.get("prices") if isinstance(option, dict) else None
+            if not entries:
+                continue
+
+            # stabil sortiert: bei gleichem Datum gewinnt die spätere Regel
+            pairs = sorted(
+                ((date_ordinal(rule["from"]), rule["price"]) for rule in entries),
+                key=lambda pair: pair[0]
+            )
+            rules[code] = ([d for d, _ in pairs], [p for _, p in pairs])
+
+        self._rules = rules
+        self._last_date: Tuple[Optional[str], int] = (None, 0)
+        self._columns = None
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._rules
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def ordinal(self, date_str: str) -> int:
+        last_str, last_ordinal = self._last_date
+        if date_str == last_str:
+            return last_ordinal
+
+        ordinal = date_ordinal(date_str)
+        self._last_date = (date_str, ordinal)
+        return ordinal
+
+    def price_at(self, code: str, ordinal: int) -> float:
+        entry = self._rules.get(code)
+        if entry is None:
+            return 0.0
+
+        dates, prices = entry
+        index = bisect_right(dates, ordinal)
+        return prices[index - 1] if index else 0.0
+
+    def price(self, code: str, date_str: str) -> float:
+        return self.price_at(code, self.ordinal(date_str))
+
+    # --------------------------------------------------
+    # COLUMNAR (NUMPY) LOOKUP
+    # --------------------------------------------------
+    def columns(self):
+        """
+        Alle Regeln als flache, sortierte NumPy-Spalten:
+        (code -> code_id, keys, key_code_ids, prices).
+        Wird beim ersten Matrix-Aufruf einmal gebaut.
+        """
+        columns = self._columns
+        if columns is not None:
+            return columns
+
+        code_ids: Dict[str, int] = {}
+        keys: List[int] = []
+        prices: List[float] = []
+
+        # Codes sortiert + Regeln je Code sortiert -> keys bereits sortiert
+        for code_id, code in enumerate(sorted(self._rules)):
+            code_ids[code] = code_id
+            dates, code_prices = self._rules[code]
+            base = code_id * KEY_STRIDE
+            keys.extend(base + d for d in dates)
+            prices.extend(code_prices)
+
+        key_array = np.array(keys, dtype=np.int64)
+        columns = (
+            code_ids,
+            key_array,
+            key_array // KEY_STRIDE,
+            np.array(prices, dtype=np.float64),
+        )
+        self._columns = columns
+        return columns
+
+    def price_matrix(self, codes: Sequence[str], dates: Sequence[str]) -> np.ndarray:
+        """
+        Preis-Matrix (len(codes) x len(dates)) in einem searchsorted-Durchlauf.
+        Unbekannte Codes oder Daten vor der ersten Regel -> 0.0
+        """
+        code_ids, keys, key_code_ids, prices = self.columns()
+
+        ids = np.array([code_ids.get(code, -1) for code in codes], dtype=np.int64)
+        ordinals = np.array([date_ordinal(d) for d in dates], dtype=np.int64)
+
+        if not len(keys):
+            return np.zeros((len(ids), len(ordinals)), dtype=np.float64)
+
+        query = ids[:, None] * KEY_STRIDE + ordinals[None, :]
+        positions = np.searchsorted(keys, query, side="right") - 1
+        clipped = np.clip(positions, 0, None)
+
+        found = (
+            (ids[:, None] >= 0)
+            & (positions >= 0)
+            & (key_code_ids[clipped] == ids[:, None])
+        )
+        return np.where(found, prices[clipped], 0.0)
+
+    def configuration_totals(
+        self,
+        configurations: Sequence[Sequence[str]],
+        dates: Sequence[str]
+    ) -> np.ndarray:
+        """
+        Gesamtpreise (len(configurations) x len(dates)):
+        jede Konfiguration ist eine Liste von Codes.
+        """
+        unique_codes = sorted({code for config in configurations for code in config})
+        row_of = {code: row for row, code in enumerate(unique_codes)}
+        matrix = self.price_matrix(unique_codes, dates)
+
+        config_ids = np.array(
+            [config_id for config_id, config in enumerate(configurations) for _ in config],
+            dtype=np.int64
+        )
+        rows = np.array(
+            [row_of[code] for config in configurations for code in config],
+            dtype=np.int64
+        )
+
+        totals = np.zeros((len(configurations), len(dates)), dtype=np.float64)
+        if len(rows):
+            np.add.at(totals, config_ids, matrix[rows])
+        return totals
+
+
 def get_price_for_date(option: Dict[str, Any], date_str: str) -> float:
-    target_date = parse_date(date_str)
+    target_date = date_ordinal(date_str)
     valid_price = 0.0
 
     for rule in option.get("prices", []):
-        rule_date = parse_date(rule["from"])
-        if target_date >= rule_date:
+        if target_date >= date_ordinal(rule["from"]):
             valid_price = rule["price"]
 
     return valid_price
 
 
-def resolve_option(code: str, options_data: Dict[str, Any], date_str: str) -> Dict[str, Any]:
+def resolve_option(
+    code: str,
+    options_data: Dict[str, Any],
+    date_str: str,
+    price_table: Optional[PriceTable] = None
+) -> Dict[str, Any]:
     if code not in options_data:
         raise ValueError(f"Unbekannter Options-Code: {code}")
 
     option = options_data[code]
-    price = get_price_for_date(option, date_str)
+
+    if price_table is not None:
+        price = price_table.price(code, date_str)
+    else:
+        price = get_price_for_date(option, date_str)
 
     return {
         "code": code,
@@ -33,5 +208,10 @@ def resolve_option(code: str, options_data: Dict[str, Any], date_str: str) -> Di
     }
 
 
-def resolve_multiple_options(codes: list, options_data: Dict[str, Any], date_str: str) -> list:
-    return [resolve_option(code, options_data, date_str) for code in codes]
+def resolve_multiple_options(
+    codes: list,
+    options_data: Dict[str, Any],
+    date_str: str,
+    price_table: Optional[PriceTable] = None
+) -> list:
+    return [resolve_option(code, options_data, date_str, price_table) for code in codes]
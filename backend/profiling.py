@@ -0,0 +1,97 @@
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+# ======================================================
+# PROFILE
+# ======================================================
+class Profile:
+    __slots__ = ("id", "label", "created_at", "duration", "stats")
+
+    def __init__(self, label: str):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.created_at = time.time()
+        self.duration = 0.0
+        self.stats: Optional[dict] = None  # cProfile-Rohdaten (wie in .prof-Dateien)
+
+    def pstats_bytes(self) -> bytes:
+        """Gleiches Format wie pstats.dump_stats (.prof) -> snakeviz, pstats."""
+        return marshal.dumps(self.stats)
+
+    def text(self, sort: str = "cumulative", limit: int = 60) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(_StatsHolder(self.stats), stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "created_at": self.created_at,
+            "duration": self.duration,
+        }
+
+
+class _StatsHolder:
+    # pstats.Stats akzeptiert alles mit create_stats() und .stats
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+# ======================================================
+# PROFILE STORE (IN-PROCESS, BEGRENZT)
+# ======================================================
+class ProfileStore:
+    """
+    Hält die letzten `max_entries` Profile im Speicher.
+    record() läuft den Block unter cProfile (deterministisch,
+    nur im aufrufenden Thread) und legt das Ergebnis ab.
+    """
+
+    def __init__(self, max_entries: int = 20):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+
+    @contextmanager
+    def record(self, label: str):
+        profile = Profile(label)
+        profiler = cProfile.Profile()
+
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            yield profile
+        finally:
+            profiler.disable()
+            profile.duration = time.perf_counter() - started
+            profiler.create_stats()
+            profile.stats = profiler.stats
+            self._add(profile)
+
+    def _add(self, profile: Profile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [profile.to_dict() for profile in reversed(self._profiles.values())]
@@ -0,0 +1,105 @@
+from typing import Dict, Iterator, List, Union
+
+# ======================================================
+# DATENMODELL (NORMALISIERTES ANGEBOT)
+# ======================================================
+CATEGORIES = ("base", "standard", "optional", "security")
+
+
+class OptionLine:
+    __slots__ = ("code", "text", "price")
+
+    def __init__(self, code: str, text: str, price: float):
+        self.code = code
+        self.text = text
+        self.price = price
+
+    def to_dict(self) -> Dict:
+        return {"code": self.code, "text": self.text, "price": self.price}
+
+    def __reduce__(self):
+        # Kompakt picklen (Render-Worker): Tupel statt Slot-Dict pro Zeile
+        return OptionLine, (self.code, self.text, self.price)
+
+    def __eq__(self, other):
+        if not isinstance(other, OptionLine):
+            return NotImplemented
+        return (self.code, self.text, self.price) == (other.code, other.text, other.price)
+
+    def __repr__(self):
+        return f"OptionLine({self.code!r}, {self.text!r}, {self.price!r})"
+
+
+class Quotation:
+    """
+    Ergebnis des Normalizers: Zeilen je Kategorie plus Zwischensummen,
+    die beim Einfügen mitgezählt werden (die Renderer summieren nicht
+    mehr selbst). total_price enthält auch Preise von Codes ohne
+    eigene Kategorie-Zeile, wie bisher.
+
+    to_dict() liefert die bisherige JSON-Form
+    {"base": [{code, text, price}, ...], ..., "total_price"}.
+    """
+
+    __slots__ = ("base", "standard", "optional", "security", "subtotals", "total_price")
+
+    def __init__(self):
+        self.base: List[OptionLine] = []
+        self.standard: List[OptionLine] = []
+        self.optional: List[OptionLine] = []
+        self.security: List[OptionLine] = []
+        self.subtotals: Dict[str, float] = dict.fromkeys(CATEGORIES, 0.0)
+        self.total_price = 0.0
+
+    def add(self, category: str, code: str, text: str, price: float):
+        """Zeile anhängen; category muss in CATEGORIES sein."""
+        getattr(self, category).append(OptionLine(code, text, price))
+        self.subtotals[category] += price
+
+    def lines(self, category: str) -> List[OptionLine]:
+        return getattr(self, category)
+
+    def subtotal(self, category: str) -> float:
+        return self.subtotals[category]
+
+    def line_count(self) -> int:
+        return len(self.base) + len(self.standard) + len(self.optional) + len(self.security)
+
+    def __iter__(self) -> Iterator[OptionLine]:
+        for category in CATEGORIES:
+            yield from getattr(self, category)
+
+    def __eq__(self, other):
+        if not isinstance(other, Quotation):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def to_dict(self) -> Dict:
+        result = {
+            category: [line.to_dict() for line in getattr(self, category)]
+            for category in CATEGORIES
+        }
+        result["total_price"] = self.total_price
+        return result
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Quotation":
+        """Auch unvollständige Dicts (fehlende Kategorien / Felder) sind erlaubt."""
+        quotation = cls()
+        for category in CATEGORIES:
+            for item in data.get(category, []):
+                quotation.add(
+                    category,
+                    item.get("code", ""),
+                    item.get("text", ""),
+                    item.get("price", 0.0)
+                )
+        quotation.total_price = data.get("total_price", 0.0)
+        return quotation
+
+
+def as_quotation(vehicle_data: Union[Quotation, Dict]) -> Quotation:
+    """Renderer nehmen Quotation oder das alte Dict-Format."""
+    if isinstance(vehicle_data, Quotation):
+        return vehicle_data
+    return Quotation.from_dict(vehicle_data)
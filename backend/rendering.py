@@ -0,0 +1,213 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from excel_builder import build_excel_bytes, build_excel_workbook, workbook_bytes
+from pdf_builder import build_pdf
+from quotation import Quotation
+
+
+# ======================================================
+# RENDER FUNCTIONS (laufen ggf. im Worker-Prozess)
+# ======================================================
+def render_document(fmt: str, vehicle_data: Union[Quotation, dict]) -> bytes:
+    """
+    Einstiegspunkt für alle Renderer. Bekommt nur das normalisierte
+    Angebot (Quotation, kompakt mit __slots__) und liefert Bytes
+    -> billig zu picklen.
+    """
+    if fmt == "excel":
+        return build_excel_bytes(vehicle_data)
+    if fmt == "pdf":
+        return build_pdf(vehicle_data)
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+def render_document_timed(fmt: str, vehicle_data: Union[Quotation, dict]) -> Tuple[bytes, Dict[str, float]]:
+    """
+    Wie render_document, misst aber zusätzlich die Stufen
+    "build" (Layout) und "save" (Serialisierung). Die Zeiten
+    reisen mit dem Ergebnis aus dem Worker-Prozess zurück.
+    """
+    started = time.perf_counter()
+
+    if fmt == "excel":
+        wb = build_excel_workbook(vehicle_data)
+        built = time.perf_counter()
+        content = workbook_bytes(wb)
+        return content, {"build": built - started, "save": time.perf_counter() - built}
+
+    content = render_document(fmt, vehicle_data)
+    return content, {"build": time.perf_counter() - started}
+
+
+def _warm_worker() -> int:
+    # Renderer einmal durchlaufen lassen: Imports, Style-Caches etc.
+    build_excel_bytes({})
+    build_pdf({})
+    return os.getpid()
+
+
+class _InlineExecutor(Executor):
+    """Rendert synchron im aufrufenden Thread (Debugging / Profiling)."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+# ======================================================
+# RENDER EXECUTOR
+# ======================================================
+class RenderExecutor:
+    """
+    Verteilt das Rendern auf einen Pool.
+
+    mode:
+      "process" - ProcessPoolExecutor, umgeht das GIL (Standard)
+      "thread"  - ThreadPoolExecutor
+      "inline"  - direkt im Request-Thread
+
+    Im Prozess-Modus wird der Pool nach `workers * max_tasks_per_worker`
+    Jobs gegen einen frischen ausgetauscht (laufende Jobs im alten Pool
+    werden noch fertig), damit Worker-Speicher nicht unbegrenzt wächst.
+    Das funktioniert auch unter Python 3.10 (kein max_tasks_per_child).
+
+    Stirbt ein Worker (z.B. OOM-Kill), ist der ProcessPoolExecutor
+    dauerhaft "broken": er wird beim nächsten submit ersetzt.
+    """
+
+    def __init__(
+        self,
+        mode: str = "process",
+        workers: Optional[int] = None,
+        max_tasks_per_worker: int = 200,
+        mp_context: Optional[str] = None,
+        on_timings: Optional[Callable[[str, Dict[str, float]], None]] = None
+    ):
+        if mode not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown render executor mode: {mode}")
+
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.mp_context = mp_context
+        self.on_timings = on_timings
+
+        self._lock = threading.Lock()
+        self._pool: Optional[Executor] = None
+        self._pool_tasks = 0
+
+        self.tasks = 0
+        self.recycles = 0
+        self.broken_pools = 0
+
+    def _new_pool(self) -> Executor:
+        if self.mode == "inline":
+            return _InlineExecutor()
+
+        if self.mode == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+
+        context = multiprocessing.get_context(self.mp_context) if self.mp_context else None
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def _renew_pool(self):
+        """Alten Pool auslaufen lassen, neuen anlegen und ohne Warten vorwärmen."""
+        self._pool.shutdown(wait=False)
+        self._pool = self._new_pool()
+        self._pool_tasks = 0
+        if self.mode != "inline":
+            for _ in range(self.workers):
+                self._pool.submit(_warm_worker)
+
+    def _replace_broken_pool(self):
+        self._renew_pool()
+        self.broken_pools += 1
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            self._pool = self._new_pool()
+            self._pool_tasks = 0
+        elif getattr(self._pool, "_broken", False):
+            self._replace_broken_pool()
+        elif (
+            self.mode == "process"
+            and self.max_tasks_per_worker > 0
+            and self._pool_tasks >= self.workers * self.max_tasks_per_worker
+        ):
+            self._renew_pool()
+            self.recycles += 1
+        return self._pool
+
+    def warm(self):
+        """Startet alle Worker vorab, damit der erste Request nicht wartet."""
+        if self.mode == "inline":
+            return
+
+        with self._lock:
+            pool = self._get_pool()
+            futures = [pool.submit(_warm_worker) for _ in range(self.workers)]
+
+        for future in futures:
+            future.result()
+
+    def submit(self, fmt: str, vehicle_data: Union[Quotation, dict]) -> Future:
+        """Future, das die fertigen Bytes liefert."""
+        with self._lock:
+            pool = self._get_pool()
+            try:
+                inner = pool.submit(render_document_timed, fmt, vehicle_data)
+            except BrokenProcessPool:
+                # Pool ist zwischen Prüfung und submit kaputtgegangen -> einmal neu
+                self._replace_broken_pool()
+                inner = self._pool.submit(render_document_timed, fmt, vehicle_data)
+            self._pool_tasks += 1
+            self.tasks += 1
+
+        outer: Future = Future()
+
+        def _done(future: Future):
+            # wrap_future (asyncio) kann outer bereits abgebrochen haben
+            if outer.cancelled():
+                return
+
+            try:
+                content, timings = future.result()
+            except BaseException as exc:
+                outer.set_exception(exc)
+                return
+
+            if self.on_timings is not None:
+                self.on_timings(fmt, timings)
+            outer.set_result(content)
+
+        inner.add_done_callback(_done)
+        return outer
+
+    def render(self, fmt: str, vehicle_data: Union[Quotation, dict]) -> bytes:
+        return self.submit(fmt, vehicle_data).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_tasks_per_worker": self.max_tasks_per_worker,
+            "tasks": self.tasks,
+            "recycles": self.recycles,
+            "broken_pools": self.broken_pools,
+        }
@@ -0,0 +1,494 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from catalog import CatalogIndex
+from pricing import KEY_STRIDE, PriceTable
+
+try:
+    import fcntl
+except ImportError:  # Windows: kein flock, os.replace bleibt atomar
+    fcntl = None
+
+# ======================================================
+# BINÄRFORMAT
+# ======================================================
+# [HEADER][META-JSON][KEYS][RECORDS][RULE_KEYS][RULE_PRICES][TEXTS]
+#
+# HEADER  magic, Länge des Meta-JSON
+# META    Version, Quell-mtime/-größe, Anzahl, Offsets, Kategorien
+# KEYS    sortierte Codes, UTF-8, mit \0 auf key_width aufgefüllt
+#         -> Lookup per Binärsuche direkt im Mapping
+# RECORDS je Code: Text-Offset/-Länge, Kategorie-Nr. (-1 = keine),
+#         erste Regel, Anzahl Regeln
+# RULES   code_id * KEY_STRIDE + Tagesnummer (int64, sortiert) und
+#         Preise (float64) -> gleiche Spalten wie PriceTable.columns()
+MAGIC = b"BMWCAT\x00\x01"
+HEADER = struct.Struct("<8sI")
+RECORD = struct.Struct("<IIiII")
+ALIGN = 8
+
+# Häufige Codes pro Prozess merken (begrenzt, unabhängig von der Katalog-Größe)
+LOOKUP_CACHE_SIZE = 8192
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def compile_catalog(
+    options: Dict,
+    path: str,
+    version: str,
+    source_mtime_ns: int = 0,
+    source_size: int = 0
+):
+    """
+    Schreibt den Katalog (Index + Preisregeln) als Binärdatei.
+    Erst in eine temporäre Datei, dann os.replace: Leser sehen
+    immer entweder die alte oder die neue Datei, nie eine halbe.
+    """
+    index = CatalogIndex(options)
+    rules = PriceTable(options)._rules
+
+    codes = sorted(index.codes, key=lambda code: code.encode("utf-8"))
+    encoded = [code.encode("utf-8") for code in codes]
+    key_width = max((len(code) for code in encoded), default=1)
+
+    categories: List[str] = []
+    category_ids: Dict[Optional[str], int] = {None: -1}
+    counts: Dict[str, int] = {}
+
+    texts = bytearray()
+    records = bytearray()
+    rule_keys: List[int] = []
+    rule_prices: List[float] = []
+
+    for code_id, code in enumerate(codes):
+        category, text = index.entries[code]
+        if category not in category_ids:
+            category_ids[category] = len(categories)
+            categories.append(category)
+        counts[str(category)] = counts.get(str(category), 0) + 1
+
+        text_bytes = text.encode("utf-8")
+        dates, prices = rules.get(code, ((), ()))
+
+        records += RECORD.pack(len(texts), len(text_bytes), category_ids[category], len(rule_keys), len(dates))
+        texts += text_bytes
+
+        base = code_id * KEY_STRIDE
+        rule_keys.extend(base + d for d in dates)
+        rule_prices.extend(float(p) for p in prices)
+
+    keys = b"".join(code.ljust(key_width, b"\0") for code in encoded)
+
+    sections = [
+        ("keys", keys),
+        ("records", bytes(records)),
+        ("rule_keys", np.array(rule_keys, dtype="<i8").tobytes()),
+        ("rule_prices", np.array(rule_prices, dtype="<f8").tobytes()),
+        ("texts", bytes(texts)),
+    ]
+
+    meta = {
+        "version": version,
+        "source_mtime_ns": source_mtime_ns,
+        "source_size": source_size,
+        "count": len(codes),
+        "rule_count": len(rule_keys),
+        "priced_codes": len(rules),
+        "key_width": key_width,
+        "categories": categories,
+        "category_counts": counts,
+    }
+
+    # Offsets hängen von der Meta-Länge ab -> Platz mit Platzhaltern
+    # maximaler Breite reservieren, danach die echten Werte eintragen
+    for name, _ in sections:
+        meta[f"{name}_offset"] = 2 ** 63 - 1
+    meta_space = _align(len(json.dumps(meta).encode("utf-8")))
+    offset = _align(HEADER.size + meta_space)
+    for name, data in sections:
+        meta[f"{name}_offset"] = offset
+        offset = _align(offset + len(data))
+    meta_bytes = json.dumps(meta).encode("utf-8").ljust(meta_space, b" ")
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, meta_space))
+            f.write(meta_bytes)
+            for name, data in sections:
+                f.seek(meta[f"{name}_offset"])
+                f.write(data)
+            f.truncate(max(offset, 1))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# ======================================================
+# MAPPED FILE
+# ======================================================
+class _Keys:
+    """Sequenz-Sicht auf die Code-Spalte für bisect."""
+
+    __slots__ = ("_buffer", "_offset", "_width", "_count")
+
+    def __init__(self, buffer, offset: int, width: int, count: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._width = width
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> bytes:
+        start = self._offset + i * self._width
+        return self._buffer[start:start + self._width]
+
+
+class MappedCatalogFile:
+    """
+    Read-only mmap einer kompilierten Katalogdatei. Alle Worker-Prozesse,
+    die dieselbe Datei mappen, teilen sich die Seiten im Page Cache.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.path = path
+        self.file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        magic, meta_len = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a compiled catalog: {path}")
+
+        meta = json.loads(self.mm[HEADER.size:HEADER.size + meta_len])
+        self.meta = meta
+        self.version: str = meta["version"]
+        self.count: int = meta["count"]
+        self.categories: List[str] = [
+            sys.intern(c) if isinstance(c, str) else c for c in meta["categories"]
+        ]
+
+        self._key_width = meta["key_width"]
+        self._records = meta["records_offset"]
+        self._texts = meta["texts_offset"]
+        self.keys = _Keys(self.mm, meta["keys_offset"], self._key_width, self.count)
+        self.find = lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._find)
+
+        buffer = memoryview(self.mm)
+        rule_count = meta["rule_count"]
+        rule_keys = meta["rule_keys_offset"]
+        self.rule_keys = np.frombuffer(buffer, dtype="<i8", count=rule_count, offset=rule_keys)
+        self.rule_prices = np.frombuffer(buffer, dtype="<f8", count=rule_count, offset=meta["rule_prices_offset"])
+        # Gleiche Spalte als int-Sequenz für bisect (ohne NumPy-Skalare)
+        self.rule_key_list = buffer[rule_keys:rule_keys + 8 * rule_count].cast("q")
+
+    @property
+    def source(self) -> Tuple[int, int]:
+        return self.meta["source_mtime_ns"], self.meta["source_size"]
+
+    def _find(self, code: str) -> int:
+        key = code.encode("utf-8")
+        if len(key) > self._key_width:
+            return -1
+        key = key.ljust(self._key_width, b"\0")
+
+        i = bisect_left(self.keys, key)
+        if i < self.count and self.keys[i] == key:
+            return i
+        return -1
+
+    def code(self, code_id: int) -> str:
+        return self.keys[code_id].rstrip(b"\0").decode("utf-8")
+
+    def record(self, code_id: int) -> Tuple[int, int, int, int, int]:
+        return RECORD.unpack_from(self.mm, self._records + code_id * RECORD.size)
+
+    def entry(self, code_id: int) -> Tuple[Optional[str], str]:
+        text_offset, text_len, category_id, _, _ = self.record(code_id)
+        start = self._texts + text_offset
+        text = self.mm[start:start + text_len].decode("utf-8")
+        category = self.categories[category_id] if category_id >= 0 else None
+        return category, text
+
+
+# ======================================================
+# VIEWS (gleiche Schnittstellen wie CatalogSnapshot)
+# ======================================================
+class MappedIndex(Mapping):
+    """code -> (category, text), wie CatalogIndex.entries."""
+
+    def __init__(self, catalog_file: MappedCatalogFile):
+        self._file = catalog_file
+
+    def get(self, code: str, default=None):
+        code_id = self._file.find(code)
+        return self._file.entry(code_id) if code_id >= 0 else default
+
+    def __getitem__(self, code: str):
+        entry = self.get(code)
+        if entry is None:
+            raise KeyError(code)
+        return entry
+
+    def __contains__(self, code) -> bool:
+        return isinstance(code, str) and self._file.find(code) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._file.code(i) for i in range(self._file.count))
+
+    def __len__(self) -> int:
+        return self._file.count
+
+
+class MappedOptions(MappedIndex):
+    """code -> {"category", "text"} anstelle der Roh-Metadaten aus dem JSON."""
+
+    def get(self, code: str, default=None):
+        entry = super().get(code)
+        if entry is None:
+            return default
+        category, text = entry
+        return {"category": category, "text": text}
+
+
+class _CodeIds:
+    __slots__ = ("_file",)
+
+    def __init__(self, catalog_file: MappedCatalogFile):
+        self._file = catalog_file
+
+    def get(self, code: str, default: int = -1) -> int:
+        code_id = self._file.find(code)
+        return code_id if code_id >= 0 else default
+
+
+class MappedPriceTable(PriceTable):
+    """PriceTable, deren Spalten direkt im Mapping liegen (keine Kopie)."""
+
+    __slots__ = ("_file",)
+
+    def __init__(self, catalog_file: MappedCatalogFile):
+        self._file = catalog_file
+        self._rules = None
+        self._last_date = (None, 0)
+        self._columns = None
+
+    def columns(self):
+        columns = self._columns
+        if columns is None:
+            catalog_file = self._file
+            columns = (
+                _CodeIds(catalog_file),
+                catalog_file.rule_keys,
+                catalog_file.rule_keys // KEY_STRIDE,  # einzige Kopie, erst bei Matrix-Abfragen
+                catalog_file.rule_prices,
+            )
+            self._columns = columns
+        return columns
+
+    def __contains__(self, code: str) -> bool:
+        code_id = self._file.find(code)
+        return code_id >= 0 and self._file.record(code_id)[4] > 0
+
+    def __len__(self) -> int:
+        return self._file.meta["priced_codes"]
+
+    def price_at(self, code: str, ordinal: int) -> float:
+        code_id = self._file.find(code)
+        if code_id < 0:
+            return 0.0
+
+        _, _, _, first, count = self._file.record(code_id)
+        index = bisect_right(self._file.rule_key_list, code_id * KEY_STRIDE + ordinal, first, first + count)
+        return float(self._file.rule_prices[index - 1]) if index > first else 0.0
+
+
+class MappedSnapshot:
+    """Gegenstück zu CatalogSnapshot auf einer gemappten Datei."""
+
+    __slots__ = ("file", "options", "index", "prices", "version", "mtime_ns", "size")
+
+    def __init__(self, catalog_file: MappedCatalogFile):
+        self.file = catalog_file
+        self.options = MappedOptions(catalog_file)
+        self.index = MappedIndex(catalog_file)
+        self.prices = MappedPriceTable(catalog_file)
+        self.version = catalog_file.version
+        self.mtime_ns, self.size = catalog_file.source
+
+    def category_counts(self) -> Dict[str, int]:
+        return dict(self.file.meta["category_counts"])
+
+
+# ======================================================
+# SHARED CATALOG (MEHRERE UVICORN-WORKER)
+# ======================================================
+class SharedCatalog:
+    """
+    Wie OptionsCatalog, aber der kompilierte Katalog liegt in einer
+    gemappten Datei, die sich alle Worker teilen -> Speicherbedarf
+    wächst nicht mit der Zahl der Worker.
+
+    Ändert sich options_meta.json, baut der erste Worker, der es merkt,
+    die Binärdatei neu (per flock nur einer gleichzeitig) und ersetzt
+    sie atomar. Die anderen sehen beim nächsten Check die neue Datei
+    und mappen sie neu; laufende Requests behalten das alte Mapping.
+    """
+
+    def __init__(self, path: str, mmap_path: str, check_interval: float = 1.0):
+        self.path = path
+        self.mmap_path = mmap_path
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._snapshot: Optional[MappedSnapshot] = None
+        self._next_check = 0.0
+
+        self.reload_count = 0
+        self.reload_errors = 0
+        self.remap_count = 0
+        self.last_load_seconds = 0.0
+        self.total_load_seconds = 0.0
+
+    def load(self) -> MappedSnapshot:
+        with self._lock:
+            return self._refresh(os.stat(self.path))
+
+    def get(self) -> MappedSnapshot:
+        snapshot = self._snapshot
+        now = time.monotonic()
+
+        if snapshot is not None and now < self._next_check:
+            return snapshot
+
+        with self._lock:
+            self._next_check = now + self.check_interval
+            snapshot = self._snapshot
+
+            try:
+                stat = os.stat(self.path)
+                if snapshot is not None and self._is_current(snapshot, stat):
+                    return snapshot
+                return self._refresh(stat)
+            except (OSError, ValueError):
+                if snapshot is None:
+                    raise
+                self.reload_errors += 1
+                return snapshot
+
+    def _is_current(self, snapshot: MappedSnapshot, stat: os.stat_result) -> bool:
+        if snapshot.file.source != (stat.st_mtime_ns, stat.st_size):
+            return False
+        # Binärdatei von außen ersetzt (anderer Worker, Deploy-Skript)?
+        try:
+            disk = os.stat(self.mmap_path)
+        except FileNotFoundError:
+            return False
+        return snapshot.file.file_id == (disk.st_ino, disk.st_mtime_ns, disk.st_size)
+
+    def _open_matching(self, stat: os.stat_result) -> Optional[MappedCatalogFile]:
+        try:
+            catalog_file = MappedCatalogFile(self.mmap_path)
+        except (OSError, ValueError, KeyError):
+            return None
+        if catalog_file.source != (stat.st_mtime_ns, stat.st_size):
+            return None
+        return catalog_file
+
+    def _refresh(self, stat: os.stat_result) -> MappedSnapshot:
+        catalog_file = self._open_matching(stat)
+
+        if catalog_file is None:
+            with open(f"{self.mmap_path}.lock", "wb") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Evtl. hat ein anderer Worker inzwischen gebaut
+                catalog_file = self._open_matching(stat)
+                if catalog_file is None:
+                    self._rebuild(stat)
+                    catalog_file = MappedCatalogFile(self.mmap_path)
+
+        if self._snapshot is not None and self._snapshot.file.file_id != catalog_file.file_id:
+            self.remap_count += 1
+
+        snapshot = MappedSnapshot(catalog_file)
+        self._snapshot = snapshot
+        return snapshot
+
+    def _rebuild(self, stat: os.stat_result):
+        started = time.perf_counter()
+
+        with open(self.path, "rb") as f:
+            raw = f.read()
+
+        options = json.loads(raw.decode("utf-8"))
+        compile_catalog(
+            options,
+            self.mmap_path,
+            version=hashlib.sha1(raw).hexdigest(),
+            source_mtime_ns=stat.st_mtime_ns,
+            source_size=stat.st_size
+        )
+
+        elapsed = time.perf_counter() - started
+        self.reload_count += 1
+        self.last_load_seconds = elapsed
+        self.total_load_seconds += elapsed
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            "backend": "mmap",
+            "path": self.path,
+            "mmap_path": self.mmap_path,
+            "version": snapshot.version if snapshot else None,
+            "codes": len(snapshot.index) if snapshot else 0,
+            "categories": snapshot.category_counts() if snapshot else {},
+            "priced_codes": len(snapshot.prices) if snapshot else 0,
+            "mapped_bytes": len(snapshot.file.mm) if snapshot else 0,
+            "reload_count": self.reload_count,
+            "reload_errors": self.reload_errors,
+            "remap_count": self.remap_count,
+            "last_load_seconds": self.last_load_seconds,
+            "total_load_seconds": self.total_load_seconds,
+        }
+
+
+if __name__ == "__main__":
+    # Vorab kompilieren (z.B. im Build-Schritt):
+    #   python shared_catalog.py options_meta.json options_meta.catalog
+    source, target = sys.argv[1], sys.argv[2]
+    with open(source, "rb") as f:
+        raw = f.read()
+    source_stat = os.stat(source)
+    compile_catalog(
+        json.loads(raw.decode("utf-8")),
+        target,
+        version=hashlib.sha1(raw).hexdigest(),
+        source_mtime_ns=source_stat.st_mtime_ns,
+        source_size=source_stat.st_size
+    )
+    print(f"{target}: {os.path.getsize(target)} bytes")
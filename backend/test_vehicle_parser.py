@@ -0,0 +1,146 @@
+"""
+Tests für den Preiszeilen-Tokenizer (vehicle_parser).
+
+    cd backend
+    python -m pytest -q test_vehicle_parser.py
+"""
+import random
+
+import pytest
+
+import vehicle_parser as vp
+from vehicle_parser import ParseStats, join_split_amount, parse_price, parse_price_line, parse_priced_lines
+
+
+@pytest.mark.parametrize("token, expected", [
+    ("100", 100.0),
+    ("12,5", 12.5),
+    ("12.50", 12.5),
+    ("1.23", 1.23),
+    ("1.234,56", 1234.56),
+    ("1,234.56", 1234.56),
+    ("12.345,6", 12345.6),
+    ("1.234.567", 1234567.0),
+    ("1.234.567,89", 1234567.89),
+    ("€1234", 1234.0),
+    ("99EUR", 99.0),
+    ("99 EUR", 99.0),
+    # genau 3 Ziffern nach einem einzelnen Separator = Tausender
+    # (früher 1,234 bzw. 1.234 als Dezimalzahl)
+    ("1.234", 1234.0),
+    ("1,234", 1234.0),
+    # nicht eindeutig / kein Betrag
+    ("1.2345", None),
+    ("1.234,5678", None),
+    ("12.34.56", None),
+    ("1,2,3", None),
+    ("abc", None),
+    ("", None),
+])
+def test_parse_price(token, expected):
+    assert parse_price(token) == expected
+
+
+@pytest.mark.parametrize("fields, expected", [
+    (["3AB", "Sitz", "100"], ["3AB", "Sitz", "100"]),
+    (["3AB", "Sitz", "100", "50"], ["3AB", "Sitz", "100,50"]),
+    (["3AB", "Sitz", "1.234", "56"], ["3AB", "Sitz", "1.234,56"]),
+    (["3AB", "Sitz", "1.234", "56", "EUR"], ["3AB", "Sitz", "1.234,56", "EUR"]),
+    # Text mit Zahl bleibt eigene Spalte
+    (["3AB", "Sitz 2", "100", "50"], ["3AB", "Sitz 2", "100,50"]),
+    # wird zusammengesetzt, parse_price verwirft es dann
+    (["3AB", "Sitz", "1", "234", "56"], ["3AB", "Sitz", "1,234,56"]),
+])
+def test_join_split_amount(fields, expected):
+    assert join_split_amount(fields) == expected
+
+
+@pytest.mark.parametrize("head, price, expected", [
+    ("3AB Sitz", "100", ("3AB Sitz", "100")),
+    ("3AB Sitz 1", "234,56", ("3AB Sitz", "1234,56")),
+    ("3AB Sitz 1 234", "567,00", ("3AB Sitz", "1234567,00")),
+    ("3AB Stufe 2", "150,50", ("3AB Stufe", "2150,50")),
+    ("3AB Felgen 19 Zoll", "1500", ("3AB Felgen 19 Zoll", "1500")),
+    # Betrag mit eigenem Tausender-Trenner: Zahl davor ist Text
+    ("3AB Option 1", "2.101,00", ("3AB Option 1", "2.101,00")),
+    # mehrdeutig
+    ("3AB Paket 2", "1500", None),
+    ("3AB Sitz 1", "23", None),
+    ("3AB Sitz 12 34", "567", None),
+])
+def test_join_space_groups(head, price, expected):
+    assert vp._join_space_groups(head, price) == expected
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("3AB Sitz 100", ("3AB", 100.0)),
+    ("  3AB  Sitz  100  ", ("3AB", 100.0)),
+    ("3AB Sitz 1.234", ("3AB", 1234.0)),
+    ("3AB Sitz 1.234 €", ("3AB", 1234.0)),
+    ("3AB Sitz EUR 1.234,56", ("3AB", 1234.56)),
+    ("3AB Sitz 1 234,56", ("3AB", 1234.56)),
+    ("3AB\tSitz\t1.234,56", ("3AB", 1234.56)),
+    ("3AB;Sitz;1.234,56 €", ("3AB", 1234.56)),
+    ('"3AB","Sitz, beheizt","1.234,56"', ("3AB", 1234.56)),
+    # unquotiertes Komma-CSV
+    ("3AB,Sitz,100", ("3AB", 100.0)),
+    ("3AB,Sitz,1.234,56", ("3AB", 1234.56)),
+    ("3AB,Sitz,1,234.56", ("3AB", 1234.56)),
+    ("66GR Paket 100", ("66GR", 100.0)),
+    # Zahlen im Text
+    ("3AB Felgen 19 Zoll 1500", ("3AB", 1500.0)),
+    ("3AB Option 54321 150,50", ("3AB", 150.5)),
+    ("3AB Option 1 2.101,00 €", ("3AB", 2101.0)),
+    ("3AB Sitzheizung Stufe 2 150,50", ("3AB", 2150.5)),
+    # mehrdeutig / ungültig
+    ("3AB Paket 2 1500", None),
+    ("3AB Sitz 1,2,3", None),
+    ("3AB Sitz €", None),
+    ("3ab Sitz 100", None),
+    ("ABCDE Sitz 100", None),
+])
+def test_parse_price_line(line, expected):
+    assert parse_price_line(line) == expected
+
+
+def test_parse_priced_lines_stats():
+    stats = ParseStats()
+    prices = parse_priced_lines(["3AB Sitz 100", "", "3AC Sitz 1 234,56", "Code;Preis", "3AD Paket 2 1500"], stats)
+
+    assert prices == {"3AB": 100.0, "3AC": 1234.56}
+    assert (stats.parsed, stats.rejected, stats.blank) == (2, 2, 1)
+
+
+FUZZ_CHARS = '0123456789.,€EUR \t;"3ABGRx'
+FUZZ_WORDS = [
+    "3AB", "66GR", "66GR ", "3ABGR ", "3A ", "3AB ", "3AB\t", " 3AB  Sitz ", "3AB;x;", "3AB,",
+    "EUR", "€", "1.234", "12,5", "1.234,56", "1,234.56", " ", " 2", " 12", " 150", " 150,50",
+    " 000", " Stufe", " 2024", "  ", " 1 234,56", " 2.101,00", "\t150", " x1", " 19 Zoll",
+]
+
+
+def fuzz_lines(count: int, seed: int):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        if rng.random() < 0.3:
+            lines.append("".join(rng.choice(FUZZ_CHARS) for _ in range(rng.randint(0, 16))))
+        else:
+            lines.append("".join(rng.choice(FUZZ_WORDS) for _ in range(rng.randint(1, 6))))
+    return lines
+
+
+@pytest.mark.parametrize("seed", [3, 7, 11])
+def test_fast_path_matches_slow_path(seed):
+    """Die Regex-Schnellpfade liefern dasselbe wie der langsame Pfad (oder nichts)."""
+    lines = fuzz_lines(20_000, seed)
+    slow = [vp._parse_slow(line, None) for line in lines]
+
+    assert [parse_price_line(line) for line in lines] == slow
+
+    expected_stats = ParseStats()
+    for line in lines:
+        vp._parse_slow(line, expected_stats)
+    stats = ParseStats()
+    assert parse_priced_lines(lines, stats) == {code: price for code, price in filter(None, slow)}
+    assert stats.to_dict() == expected_stats.to_dict()
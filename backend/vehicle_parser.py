@@ -1,42 +1,463 @@
+import codecs
+import csv
 import re
-from typing import List, Dict
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from quotation import OptionLine, Quotation
 
 # ======================================================
-# PRICE LINE PARSER
+# PRICE LINE TOKENIZER
 # ======================================================
-PRICE_LINE_REGEX = re.compile(
-    r"^(?P<code>[A-Z0-9]{3})\s+.+?\s+(?P<price>\d+(?:[.,]\d+)?)$"
+# Unterstützte Zeilen (Händler-Exporte):
+#   3AB Sitzheizung 100            3AB Sitzheizung 1.234,56 €
+#   3AB Sitzheizung 1,234.56       3AB Sitzheizung EUR 1234
+#   3AB Sitzheizung 1 234,56       3AB,Sitzheizung,1.234,56
+#   3AB<TAB>Sitzheizung<TAB>100    3AB;Sitzheizung;1.234,56
+#   3AB,Sitzheizung,100            "3AB","Sitz, beheizt","1.234,56"
+#
+# Der häufigste Fall ('CODE [Text] 123' / '123,45' / '123.45') läuft
+# über einen schlanken, verankerten Regex ohne Lazy-Backtracking, Währung
+# und Tausender-Punkte über einen zweiten; alles andere über str-Methoden
+# (strip / split / rpartition).
+# Zahlen im Text ('Stufe 2', 'Felgen 19 Zoll') bleiben Text, solange das
+# letzte Wort vor dem Betrag keine freie 1-3-stellige Zahl ist (die
+# Lookbehinds). Sonst ist es eine Tausender-Gruppe: 'Sitz 1 234,56'
+# -> 1234,56, 'Stufe 2 150,50' -> 2150,50; was davon nicht passt
+# ('Paket 2 1500') klärt bzw. verwirft der langsame Pfad.
+_CODE_AND_TEXT = (
+    r"\s*([A-Z0-9]{3,4})[ \t]"
+    r"(?:.*[^ \t](?=[ \t])(?<![ \t]\d)(?<![ \t]\d\d)(?<![ \t]\d\d\d)[ \t]+)?"
+)
+
+# Häufigster Fall zuerst, so schlank wie der alte Regex: '150', '150,50',
+# '1 234,56' (ohne Währung und Tausender-Punkt)
+PLAIN_LINE_REGEX = re.compile(
+    _CODE_AND_TEXT + r"(?:(\d+)|(\d{1,3}(?: \d{3})+))(?:[.,](\d\d?))?\s*\Z"
 )
 
+FAST_LINE_REGEX = re.compile(
+    _CODE_AND_TEXT
+    + r"(?:(?:EUR|€) ?)?"
+    r"(?:(\d+)"                                       # Ganzzahl
+    r"|(\d{1,3}(?: \d{3})+)"                         # '1 234 567'
+    r"|(\d{1,3}([.,])\d{3}(?:\5\d{3})*))"           # '1.234.567'
+    r"(?:([.,])(\d\d?))?"                            # Dezimalstellen
+    r"(?: ?(?:€|EUR))?\s*\Z"
+)
+
+CODE_LENGTHS = (3, 4)  # '3AB', Katalog auch '66GR'
+CODE_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+DIGITS = "0123456789"
+NUMBER_CHARS = DIGITS + ".,"
+CURRENCY_CHARS = "€$£ "
+CURRENCY_WORDS = frozenset(("€", "$", "£", "EUR", "USD", "GBP", "CHF"))
+FIELD_STRIP = " \"'"
+
+
+class ParseStats:
+    """Zählt, was der Tokenizer mit den Zeilen gemacht hat."""
+
+    __slots__ = ("parsed", "rejected", "blank", "samples")
+
+    MAX_SAMPLES = 5
+
+    def __init__(self):
+        self.parsed = 0
+        self.rejected = 0
+        self.blank = 0
+        self.samples: List[str] = []
+
+    def reject(self, line: str):
+        self.rejected += 1
+        if len(self.samples) < self.MAX_SAMPLES:
+            self.samples.append(line)
+
+    def to_dict(self) -> Dict:
+        return {
+            "parsed": self.parsed,
+            "rejected": self.rejected,
+            "blank": self.blank,
+            "rejected_samples": self.samples,
+        }
+
 
-def parse_priced_lines(lines: List[str]) -> Dict[str, float]:
+_plain_match = PLAIN_LINE_REGEX.match
+_fast_match = FAST_LINE_REGEX.match
+
+
+def _is_code(code: str) -> bool:
+    return len(code) in CODE_LENGTHS and not code.strip(CODE_CHARS)
+
+
+def _valid_groups(integer: str, separator: str) -> bool:
+    """'1.234.567': erste Gruppe 1-3 Ziffern, alle weiteren genau 3."""
+    first = integer.find(separator)
+    groups, rest = divmod(len(integer) - first, 4)
+    return (
+        0 < first <= 3
+        and not rest
+        and integer.count(separator) == groups
+        and integer[first::4] == separator * groups
+    )
+
+
+def parse_price(token: str) -> Optional[float]:
+    """
+    '100', '12,5', '1.234,56', '1,234.56', '1.234.567', '€1234', '99 EUR'
+    Letzter Separator mit 1-2 Nachkommastellen = Dezimaltrenner;
+    genau 3 Ziffern nach einem einzelnen Separator = Tausender ('1.234' -> 1234);
+    mehr als 3 Ziffern dahinter ('1.2345') -> None.
+    """
+    if not (token[:1].isdigit() and token[-1:].isdigit()):
+        # Währung direkt am Betrag: '€1234', '99EUR'
+        if token[-3:] in CURRENCY_WORDS:
+            token = token[:-3]
+        if token[:3] in CURRENCY_WORDS:
+            token = token[3:]
+        token = token.strip(CURRENCY_CHARS)
+
+    if not token or token.strip(NUMBER_CHARS):
+        return None
+
+    # Schnellster Fall: nur Ziffern
+    if not token.strip(DIGITS):
+        return float(token)
+
+    last = max(token.rfind("."), token.rfind(","))
+    separator = token[last]
+    other = "," if separator == "." else "."
+    integer, fraction = token[:last], token[last + 1:]
+
+    if not fraction or fraction.strip(DIGITS) or len(fraction) > 3:
+        return None
+
+    if other in integer:
+        # beide Separatoren: '1.234,56' / '1,234.56'
+        if not _valid_groups(integer, other) or len(fraction) > 2:
+            return None
+        integer = integer.replace(other, "")
+    elif separator in integer or len(fraction) == 3:
+        # nur Tausender: '1.234.567' / '1.234'
+        if not _valid_groups(token, separator):
+            return None
+        return float(token.replace(separator, ""))
+
+    if not integer or integer.strip(DIGITS):
+        return None
+    return float(f"{integer}.{fraction}")
+
+
+def _parse_fields(fields: List[str]) -> Optional[Tuple[str, float]]:
+    """Spalten-Formate: Code vorne, Preis in der letzten Spalte mit Inhalt."""
+    if len(fields) < 2:
+        return None
+
+    code = fields[0].strip(FIELD_STRIP)
+    if not _is_code(code):
+        return None
+
+    for field in reversed(fields[1:]):
+        field = field.strip(FIELD_STRIP)
+        if field and field not in CURRENCY_WORDS:
+            price = parse_price(field)
+            return (code, price) if price is not None else None
+    return None
+
+
+def _is_amount_fragment(field: str) -> bool:
+    field = field.strip(FIELD_STRIP)
+    return bool(field) and not field.strip(NUMBER_CHARS)
+
+
+def join_split_amount(fields: List[str]) -> List[str]:
+    """
+    Unquotiertes Komma-CSV zerlegt Beträge mit Dezimal-/Tausender-Komma:
+    ['3AB', 'Sitz', '1.234', '56'] -> ['3AB', 'Sitz', '1.234,56'].
+    Bei mehr als 3 Feldern werden die Zahlen-Fragmente am Ende (nach
+    Code und Text, vor einer Währungsspalte) wieder zusammengesetzt.
+    """
+    if len(fields) <= 3:
+        return fields
+
+    end = len(fields)
+    if fields[-1].strip(FIELD_STRIP) in CURRENCY_WORDS:
+        end -= 1
+
+    start = end
+    while start > 2 and _is_amount_fragment(fields[start - 1]):
+        start -= 1
+
+    if end - start < 2:
+        return fields
+    amount = ",".join(field.strip(FIELD_STRIP) for field in fields[start:end])
+    return fields[:start] + [amount] + fields[end:]
+
+
+def _is_number_word(word: str) -> bool:
+    return 0 < len(word) <= 3 and not word.strip(DIGITS)
+
+
+def _has_thousands(price: str) -> bool:
+    """'2.101,00' / '1,234' - Ziffern, Trenner, genau 3 Ziffern."""
+    digits = len(price) - len(price.lstrip(DIGITS))
+    return (
+        0 < digits <= 3
+        and price[digits:digits + 1] in (".", ",")
+        and len(price) >= digits + 4
+        and price[digits + 1:digits + 4].isdigit()
+        and not price[digits + 4:digits + 5].isdigit()
+    )
+
+
+def _join_space_groups(head: str, price: str) -> Optional[Tuple[str, str]]:
+    """
+    'Sitz 1 234,56': freie 1-3-stellige Zahlen vor dem Betrag (je ein
+    Leerzeichen dazwischen) sind Tausender-Gruppen. Passt das Muster
+    nicht ('Paket 2 1500', 'Sitz 1  234'), ist die Zeile mehrdeutig
+    -> None statt eines Teilbetrags.
+    """
+    groups = []
+    rest = head
+    while True:
+        before, _, word = rest.rpartition(" ")
+        if not before or not _is_number_word(word):
+            break
+        groups.append(word)
+        rest = before
+
+    if not groups:
+        words = head.split()
+        if len(words) > 1 and _is_number_word(words[-1]) and not _has_thousands(price):
+            return None
+        return head, price
+
+    # Betrag mit eigenem Tausender-Trenner ('Option 1 2.101,00'):
+    # die Zahl davor gehört zum Text
+    if _has_thousands(price):
+        return head, price
+
+    # sonst: nur die linke Gruppe darf kürzer als 3 Ziffern sein, der
+    # Betrag selbst beginnt mit genau 3 Ziffern
+    if any(len(group) != 3 for group in groups[:-1]):
+        return None
+    if not (len(price) >= 3 and price[:3].isdigit() and not price[3:4].isdigit()):
+        return None
+    return rest, "".join(reversed(groups)) + price
+
+
+def _parse_words(line: str) -> Optional[Tuple[str, float]]:
+    """'CODE [Text] PREIS [Währung]', auch '1 234,56'"""
+    if "\t" in line or "\xa0" in line:
+        line = line.replace("\t", " ").replace("\xa0", " ")
+
+    head, _, price = line.rpartition(" ")
+    if price in CURRENCY_WORDS:
+        head, _, price = head.rstrip().rpartition(" ")
+
+    joined = _join_space_groups(head, price)
+    if joined is None:
+        return None
+    head, price = joined
+
+    code = head.partition(" ")[0]
+    if not _is_code(code):
+        return None
+
+    value = parse_price(price)
+    return (code, value) if value is not None else None
+
+
+def _price_from_match(match) -> Optional[Tuple[str, float]]:
+    code, integer, groups, grouped, thousands, decimal, fraction = match.groups()
+    if groups is not None:
+        integer = groups.replace(" ", "")
+    elif grouped is not None:
+        if thousands == decimal:
+            return None
+        integer = grouped.replace(thousands, "")
+    return code, float(f"{integer}.{fraction}" if fraction else integer)
+
+
+def _parse_slow(line: str, stats: Optional[ParseStats]) -> Optional[Tuple[str, float]]:
+    line = line.strip()
+    if not line:
+        if stats is not None:
+            stats.blank += 1
+        return None
+
+    if "\t" in line:
+        parsed = _parse_fields(line.split("\t"))
+    elif ";" in line:
+        parsed = _parse_fields(line.split(";"))
+    elif line[0] == '"':
+        parsed = _parse_fields(next(csv.reader([line])))
+    elif _is_code(line.partition(",")[0]):
+        parsed = _parse_fields(join_split_amount(line.split(",")))
+    else:
+        parsed = None
+
+    if parsed is None:
+        # auch z.B. '3AB Sitz; beheizt 100'
+        parsed = _parse_words(line)
+
+    if stats is not None:
+        if parsed is None:
+            stats.reject(line)
+        else:
+            stats.parsed += 1
+    return parsed
+
+
+def parse_price_line(line: str, stats: Optional[ParseStats] = None) -> Optional[Tuple[str, float]]:
+    match = _plain_match(line)
+    if match is not None:
+        code, integer, groups, fraction = match.groups()
+        if integer is None:
+            integer = groups.replace(" ", "")
+        if stats is not None:
+            stats.parsed += 1
+        return code, float(f"{integer}.{fraction}" if fraction else integer)
+
+    match = _fast_match(line)
+    if match is not None:
+        parsed = _price_from_match(match)
+        if parsed is not None:
+            if stats is not None:
+                stats.parsed += 1
+            return parsed
+    return _parse_slow(line, stats)
+
+
+def parse_priced_lines(lines: Iterable[str], stats: Optional[ParseStats] = None) -> Dict[str, float]:
     """
     Extrahiert Preise aus z.B.:
     '3AB Sitzheizung 100'
-    '3AD M-Lenkrad 3000'
-    
-    Wenn keine Preise angegeben sind, ignoriere die Zeile.
+    '3AD M-Lenkrad 3.000,00 €'
+    '3AE;Lenkradheizung;150'
+
+    Zeilen ohne erkennbaren Preis werden übersprungen und in
+    `stats` (optional) als abgelehnt gezählt.
+    `lines` darf ein Generator sein (Streaming-Upload).
     """
     prices: Dict[str, float] = {}
+    plain_match = _plain_match
+    fast_match = _fast_match
+    fast_parsed = 0
 
+    # Wie parse_price_line, aber die Schnellpfade direkt in der Schleife
+    # (kein Funktionsaufruf pro Zeile)
     for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        match = PRICE_LINE_REGEX.match(line)
-        if not match:
-            # Keine Fehlermeldung, einfach ignorieren
+        match = plain_match(line)
+        if match is not None:
+            code, integer, groups, fraction = match.groups()
+            if integer is None:
+                integer = groups.replace(" ", "")
+            prices[code] = float(f"{integer}.{fraction}") if fraction else float(integer)
+            fast_parsed += 1
             continue
 
-        code = match.group("code")
-        price = float(match.group("price").replace(",", "."))
+        match = fast_match(line)
+        if match is not None:
+            parsed = _price_from_match(match)
+            if parsed is not None:
+                prices[parsed[0]] = parsed[1]
+                fast_parsed += 1
+                continue
+
+        parsed = _parse_slow(line, stats)
+        if parsed is not None:
+            code, price = parsed
+            prices[code] = price
+
+    if stats is not None:
+        stats.parsed += fast_parsed
+    return prices
+
+
+# ======================================================
+# STREAMING INPUT (BYTES -> LINES)
+# ======================================================
+class LineSplitter:
+    """
+    Zerlegt beliebig gestückelte Bytes inkrementell in Zeilen.
+    Es wird nie mehr als die aktuelle, unvollständige Zeile gepuffert.
+    """
+
+    def __init__(self, encoding: str = "utf-8-sig"):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._pending = ""
 
-        prices[code] = price
+    def feed(self, chunk: bytes) -> List[str]:
+        text = self._pending + self._decoder.decode(chunk)
+        lines = text.split("\n")
+        self._pending = lines.pop()
+        return lines
+
+    def finish(self) -> List[str]:
+        rest = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        return [rest] if rest else []
+
+
+def iter_text_lines(chunks: Iterable[bytes], encoding: str = "utf-8-sig") -> Iterator[str]:
+    splitter = LineSplitter(encoding)
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.finish()
+
+
+async def aiter_text_lines(
+    chunks: AsyncIterable[bytes],
+    encoding: str = "utf-8-sig"
+) -> AsyncIterator[str]:
+    splitter = LineSplitter(encoding)
+    async for chunk in chunks:
+        for line in splitter.feed(chunk):
+            yield line
+    for line in splitter.finish():
+        yield line
+
+
+async def aparse_priced_lines(
+    chunks: AsyncIterable[bytes],
+    stats: Optional[ParseStats] = None
+) -> Dict[str, float]:
+    """Wie parse_priced_lines, aber direkt auf einem Request-Body-Stream."""
+    prices: Dict[str, float] = {}
+
+    async for line in aiter_text_lines(chunks):
+        parsed = parse_price_line(line, stats)
+        if parsed is not None:
+            code, price = parsed
+            prices[code] = price
 
     return prices
 
 
+# ======================================================
+# OPTION INDEX (code -> (category, text))
+# ======================================================
+def option_text(meta: Dict, code: str) -> str:
+    return (
+        meta.get("text")
+        or meta.get("label")
+        or meta.get("description")
+        or code
+    )
+
+
+def build_option_index(options_meta: Dict) -> Dict[str, Tuple[Optional[str], str]]:
+    """
+    Einmal pro Katalogstand: Kategorie und Anzeigetext je Code,
+    damit der Normalizer die Fallback-Kette nicht pro Request läuft.
+    """
+    return {
+        code: (meta.get("category"), option_text(meta, code))
+        for code, meta in options_meta.items()
+        if meta
+    }
+
+
 # ======================================================
 # NORMALIZER (FINAL & STABLE)
 # ======================================================
@@ -46,84 +467,67 @@ def normalize_vehicle_input(
     color: str,
     interior: str,
     all_codes: List[str],
-    priced_lines: List[str],
-    options_meta: Dict
-) -> Dict:
+    priced_lines: Iterable[str] = (),
+    options_meta: Dict,
+    option_index: Optional[Dict[str, Tuple[Optional[str], str]]] = None,
+    priced_prices: Optional[Dict[str, float]] = None
+) -> Quotation:
     """
     Baut die finale strukturierte Fahrzeugdarstellung
+
+    Ein Durchlauf über all_codes; Reihenfolge innerhalb jeder
+    Kategorie entspricht der Eingabe. `option_index` kommt
+    normalerweise vorberechnet aus dem Katalog. Bereits geparste
+    Preise (Streaming-Upload) können über `priced_prices` kommen.
+    JSON-Form über Quotation.to_dict().
     """
 
-    priced_prices = parse_priced_lines(priced_lines)
+    if priced_prices is None:
+        priced_prices = parse_priced_lines(priced_lines)
 
-    result = {
-        "base": [],
-        "standard": [],
-        "optional": [],
-        "security": [],
-        "total_price": 0.0
-    }
+    result = Quotation()
 
-    # ----------------------------
-    # BASE VEHICLE (inkl. TRIM)
-    # ----------------------------
-    base_codes = []
+    if option_index is not None:
+        lookup = option_index.get
+    else:
+        def lookup(code):
+            meta = options_meta.get(code)
+            if not meta:
+                return None
+            return meta.get("category"), option_text(meta, code)
 
-    for code in all_codes:
-        meta = options_meta.get(code)
-        if meta and meta.get("category") == "base":
-            base_codes.append(code)
-
-    for code in base_codes:
-        meta = options_meta.get(code, {})
-
-        text = (
-            meta.get("text")
-            or meta.get("label")
-            or meta.get("description")
-            or code
-        )
-
-        result["base"].append({
-            "code": code,
-            "text": text,
-            "price": 0.0
-        })
-
-    # ----------------------------
-    # ALL OTHER CODES (NICHT BASE)
-    # ----------------------------
-    for code in all_codes:
-        if code in base_codes:
-            continue
+    base = result.base
+    buckets = {
+        "standard": (result.standard, "standard"),
+        "optional": (result.optional, "optional"),
+        "security": (result.security, "security"),
+    }
+    subtotals = result.subtotals
+    price_of = priced_prices.get
+    total_price = 0.0
 
-        meta = options_meta.get(code)
-        if not meta:
+    for code in all_codes:
+        entry = lookup(code)
+        if entry is None:
             continue
 
-        category = meta.get("category")
+        category, text = entry
 
-        text = (
-            meta.get("text")
-            or meta.get("label")
-            or meta.get("description")
-            or code
-        )
+        # BASE VEHICLE (inkl. TRIM) -> immer ohne Preis
+        if category == "base":
+            base.append(OptionLine(code, text, 0.0))
+            continue
 
-        price = priced_prices.get(code, 0.0)
+        price = price_of(code, 0.0)
 
-        item = {
-            "code": code,
-            "text": text,
-            "price": price
-        }
+        bucket = buckets.get(category)
+        if bucket is not None:
+            lines, name = bucket
+            lines.append(OptionLine(code, text, price))
+            subtotals[name] += price
 
-        if category == "standard":
-            result["standard"].append(item)
-        elif category == "optional":
-            result["optional"].append(item)
-        elif category == "security":
-            result["security"].append(item)
+        total_price += price
 
-        result["total_price"] += price
+    result.total_price = total_price
 
     return result
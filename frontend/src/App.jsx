@@ -11,6 +11,10 @@ import {
 
 // Backend URL (wird von .env gelesen, fallback zu localhost)
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL || 'http://localhost:8000';
+const JOB_POLL_INTERVAL_MS = 500;
+
+// Datei-Endung -> Backend-Format ("zip" = Excel + PDF aus einem Durchlauf)
+const EXPORT_FORMATS = { xlsx: "excel", pdf: "pdf", zip: "bundle" };
 
 const DEPARTMENTS = ["MH", "FR", "CG", "JR"];
 const NUMBER_TYPES = ["VIN", "Order NR.", "Proforma Order NR."];
@@ -41,6 +45,98 @@ const getPriceByDate = (code, dateStr) => {
   return rule ? rule.price : (rules[0] ? rules[0].price : 0);
 };
 
+// Server ausgelastet (429 / 503): Retry-After für die Meldung mitgeben
+class ServerBusyError extends Error {
+  constructor(retryAfter) {
+    super("Server busy");
+    this.retryAfter = retryAfter;
+  }
+}
+
+const checkBusy = (response) => {
+  if (response.status === 429 || response.status === 503) {
+    throw new ServerBusyError(response.headers.get("Retry-After"));
+  }
+};
+
+// Export als Job: anlegen, Status abfragen, Ergebnis holen
+const exportViaJob = async (payload) => {
+  // Job anlegen (Backend antwortet sofort mit Job-ID)
+  const jobResponse = await fetch(`${BACKEND_URL}/jobs`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json"
+    },
+    body: JSON.stringify(payload)
+  });
+
+  checkBusy(jobResponse);
+  if (!jobResponse.ok) {
+    const errorData = await jobResponse.json().catch(() => ({}));
+    console.error('Backend error:', errorData);
+    throw new Error(`Backend error: ${jobResponse.status}`);
+  }
+
+  const job = await jobResponse.json();
+
+  // Status abfragen, bis der Job fertig ist
+  let status = job.status;
+  while (status !== "done") {
+    await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+
+    const statusResponse = await fetch(`${BACKEND_URL}${job.status_url}`);
+    if (!statusResponse.ok) {
+      throw new Error(`Job status error: ${statusResponse.status}`);
+    }
+
+    const jobStatus = await statusResponse.json();
+    status = jobStatus.status;
+
+    if (status === "failed") {
+      console.error('Job failed:', jobStatus.error);
+      throw new Error(`Job failed: ${jobStatus.error}`);
+    }
+  }
+
+  const response = await fetch(`${BACKEND_URL}${job.result_url}`);
+  if (!response.ok) {
+    throw new Error(`Backend error: ${response.status}`);
+  }
+
+  return { blob: await response.blob(), rejected: job.rejected_lines };
+};
+
+// Export mit Händler-Preisliste: Backend liest Codes + Preise direkt aus CSV / XLSX
+const exportViaImport = async (payload, file) => {
+  const params = new URLSearchParams({
+    date: payload.date,
+    model: payload.model,
+    color: payload.color,
+    interior: payload.interior,
+    all_codes: payload.all_codes.join(" "),
+    format: payload.format
+  });
+  const form = new FormData();
+  form.append("file", file);
+
+  const response = await fetch(`${BACKEND_URL}/generate/import?${params}`, {
+    method: "POST",
+    body: form
+  });
+
+  checkBusy(response);
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    console.error('Backend error:', errorData);
+    throw new Error(`Backend error: ${response.status}`);
+  }
+
+  return {
+    blob: await response.blob(),
+    rejected: Number(response.headers.get("X-Rejected-Lines") || 0)
+  };
+};
+
 /** --- HAUPTKOMPONENTE --- **/
 
 export default function App() {
@@ -56,6 +152,7 @@ export default function App() {
   
   const [bulkCodes, setBulkCodes] = useState(''); 
   const [pricedCodes, setPricedCodes] = useState('');
+  const [priceFile, setPriceFile] = useState(null); // Händler-Preisliste (CSV / XLSX)
   const [extraNotes, setExtraNotes] = useState(''); // XXXL Feld
 
   const salesPerson = { name: "Max Mustermann", id: "ADMIN-01" };
@@ -93,25 +190,14 @@ const handleExport = async (format) => {
         .map(l => l.trim())
         .filter(Boolean),
 
-      format: format === "xlsx" ? "excel" : "pdf"
+      format: EXPORT_FORMATS[format]
     };
 
-    const response = await fetch(`${BACKEND_URL}/generate`, {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json"
-      },
-      body: JSON.stringify(payload)
-    });
-
-    if (!response.ok) {
-      const errorData = await response.json().catch(() => ({}));
-      console.error('Backend error:', errorData);
-      throw new Error(`Backend error: ${response.status}`);
-    }
-    
-    // Hole die Datei als Blob
-    const blob = await response.blob();
+    // Mit Preisliste-Datei direkt über /generate/import, sonst als Job
+    const { blob, rejected } = priceFile
+      ? await exportViaImport(payload, priceFile)
+      : await exportViaJob(payload);
+
     const url = URL.createObjectURL(blob);
     const a = document.createElement('a');
     a.href = url;
@@ -120,7 +206,16 @@ const handleExport = async (format) => {
     a.click();
     document.body.removeChild(a);
     URL.revokeObjectURL(url);
+
+    // Preiszeilen, die das Backend nicht lesen konnte, fehlen im Angebot
+    if (rejected > 0) {
+      alert(`⚠️ ${rejected} Preiszeile(n) konnten nicht gelesen werden und fehlen im Angebot.`);
+    }
   } catch (error) {
+    if (error instanceof ServerBusyError) {
+      alert(`⏳ Server ausgelastet – bitte in ${error.retryAfter || "ein paar"} Sekunden erneut exportieren.`);
+      return;
+    }
     console.error('Export failed:', error);
     alert('Export fehlgeschlagen. Bitte versuchen Sie es erneut.');
   }
@@ -241,6 +336,15 @@ const handleExport = async (format) => {
                 placeholder="Format: CODE Name Price (eine pro Zeile)&#10;1AB Brakes 500&#10;1AC Floor Mats 200&#10;109 Security Package VR6 1000"
                 className="w-full bg-slate-50 border border-slate-200 rounded-lg p-4 font-mono text-base text-slate-700 focus:ring-2 focus:ring-blue-500/20 focus:border-blue-500 transition-all outline-none leading-relaxed"
               ></textarea>
+              <label className="mt-4 flex items-center justify-between text-xs font-semibold text-slate-600">
+                <span>Preisliste (CSV / XLSX){priceFile ? `: ${priceFile.name}` : ""}</span>
+                <input
+                  type="file"
+                  accept=".csv,.txt,.xlsx,.xlsm"
+                  onChange={(e) => setPriceFile(e.target.files[0] || null)}
+                  className="text-xs text-slate-500"
+                />
+              </label>
             </div>
 
             {/* Sektion 3: Extra Notes (XXXL) */}
@@ -299,6 +403,14 @@ const handleExport = async (format) => {
                     <FileText size={16} />
                     <span>Excel Export</span>
                   </button>
+
+                  <button 
+                    onClick={() => handleExport('zip')} 
+                    className="w-full flex items-center justify-center gap-2 bg-blue-600 hover:bg-blue-700 text-white p-3 rounded-lg transition-all font-semibold text-sm"
+                  >
+                    <FileDown size={16} />
+                    <span>Excel + PDF</span>
+                  </button>
                </div>
 
                <div className="mt-6 pt-6 border-t border-slate-200">
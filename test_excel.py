@@ -1,5 +1,5 @@
 from excel_builder import build_excel
 
 if __name__ == "__main__":
-    path = build_excel()
+    path = build_excel({})
     print("Excel erstellt:", path)